@@ -0,0 +1,156 @@
+# agentRegistry.py
+# ----------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+Finds the *gents.py module that provides an agent without importing the
+others.
+
+Every agent file is read once with the ast module to list the names it
+binds at top level, split into names it defines (classes, functions,
+assignments) and names it imports.  The index is kept in INDEX_FILE by
+file path, modification time and size, and directory listings by
+directory modification time, so a later run only stats the directories
+and files; a changed file or directory is indexed again.  Names bound in
+ways the index cannot see, such as star imports, are left to
+pacman.loadAgent's fallback scan.
+"""
+
+import json
+import os
+
+INDEX_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.agent_index.json')
+INDEX = None
+INDEX_DIRTY = False
+
+
+def loadIndex():
+    global INDEX
+    try:
+        with open(INDEX_FILE) as handle:
+            INDEX = json.load(handle)
+        if not isinstance(INDEX.get('files'), dict) or not isinstance(INDEX.get('dirs'), dict):
+            raise ValueError('old index format')
+    except (OSError, ValueError):
+        INDEX = {'dirs': {}, 'files': {}}
+
+
+def saveIndex():
+    global INDEX_DIRTY
+    if not INDEX_DIRTY:
+        return
+    temporary = '%s.%d.tmp' % (INDEX_FILE, os.getpid())
+    try:
+        with open(temporary, 'w') as handle:
+            json.dump(INDEX, handle, sort_keys=True)
+        os.replace(temporary, INDEX_FILE)
+        INDEX_DIRTY = False
+    except OSError:
+        pass
+
+
+def topLevelNames(source):
+    """
+    Returns (defined, imported, starImport) for the top level of a module.
+    """
+    # Only needed when a file changed, and slow to import
+    import ast
+    defined, imported, starImport = set(), set(), False
+    for node in ast.parse(source).body:
+        if isinstance(node, (ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)):
+            defined.add(node.name)
+        elif isinstance(node, (ast.Assign, ast.AnnAssign, ast.AugAssign)):
+            targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+            for target in targets:
+                for name in ast.walk(target):
+                    if isinstance(name, ast.Name):
+                        defined.add(name.id)
+        elif isinstance(node, (ast.Import, ast.ImportFrom)):
+            for alias in node.names:
+                if alias.name == '*':
+                    starImport = True
+                else:
+                    imported.add(alias.asname or alias.name.split('.')[0])
+    return sorted(defined), sorted(imported), starImport
+
+
+def agentFiles(directory):
+    """
+    Returns the sorted *gents.py file names in a directory, from the index
+    while the directory is unchanged.
+    """
+    global INDEX_DIRTY
+    key = os.path.abspath(directory)
+    try:
+        stamp = os.stat(key).st_mtime_ns
+    except OSError:
+        return []
+    cached = INDEX['dirs'].get(key)
+    if cached is None or cached['mtime'] != stamp:
+        names = sorted(f for f in os.listdir(key) if f.endswith('gents.py'))
+        cached = INDEX['dirs'][key] = {'mtime': stamp, 'files': names}
+        INDEX_DIRTY = True
+    return cached['files']
+
+
+def fileEntry(path):
+    """
+    Returns the index entry of an agent file, parsing it if it changed.
+    """
+    global INDEX_DIRTY
+    key = os.path.abspath(path)
+    try:
+        stat = os.stat(key)
+    except OSError:
+        return None
+    cached = INDEX['files'].get(key)
+    if cached is None or cached['mtime'] != stat.st_mtime_ns or cached['size'] != stat.st_size:
+        try:
+            with open(key, 'rb') as handle:
+                defined, imported, starImport = topLevelNames(handle.read())
+        except (SyntaxError, ValueError):
+            # Importing it will report the problem if it is ever needed
+            defined, imported, starImport = [], [], True
+        cached = INDEX['files'][key] = {'mtime': stat.st_mtime_ns, 'size': stat.st_size,
+                                        'defined': defined, 'imported': imported,
+                                        'star': starImport}
+        INDEX_DIRTY = True
+    return cached
+
+
+def candidateModules(name, directories):
+    """
+    Returns the agent file names (like 'multiAgents.py') that bind name at
+    top level, searching directories in order: first the files that
+    define it, then the files that import it.
+    """
+    if INDEX is None:
+        loadIndex()
+    definers, importers = [], []
+    for directory in directories:
+        if not os.path.isdir(directory):
+            continue
+        for fileName in agentFiles(directory):
+            entry = fileEntry(os.path.join(directory, fileName))
+            if entry is None:
+                continue
+            if name in entry['defined']:
+                definers.append(fileName)
+            elif name in entry['imported']:
+                importers.append(fileName)
+    saveIndex()
+    candidates = []
+    for fileName in definers + importers:
+        if fileName not in candidates:
+            candidates.append(fileName)
+    return candidates
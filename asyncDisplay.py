@@ -0,0 +1,204 @@
+# asyncDisplay.py
+# ---------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+Runs a display in a rendering thread or process, apart from the game loop.
+
+AsyncDisplay looks like a display to the game, but update() only puts a
+small diff of the state (the agents that changed, the food or capsule eaten,
+the score) on a queue and returns.  The renderer applies the diffs to its own
+copy of the state and passes it to the wrapped display.  When more than
+maxLag moves are waiting, the renderer skips drawing moves that are followed
+by a later move of the same agent; moves that eat food or a capsule, or end
+the game, are always drawn.  finish() waits for the renderer to catch up, so
+the last frame of every game is shown.
+
+  python pacman.py -p ExpectimaxAgent --asyncDisplay process
+
+Keyboard agents read keys from the window, so they need the display in the
+game's own thread.  Tkinter must only be used from the thread that created
+it, which the game loop already occupies, so the Tk display
+(graphicsDisplay) is always drawn in a separate process; 'thread' mode is
+for text displays.
+"""
+
+import multiprocessing
+import queue
+import sys
+import threading
+import traceback
+
+
+def usesTk(display):
+    # A display can only be a graphicsDisplay one if that module is loaded
+    graphicsDisplay = sys.modules.get('graphicsDisplay')
+    return graphicsDisplay is not None and isinstance(display, graphicsDisplay.PacmanGraphics)
+
+
+def agentSnapshot(agentState):
+    return (agentState.configuration, agentState.scaredTimer, agentState.isPacman)
+
+
+class AsyncDisplay:
+    """
+    Wraps a display (graphicsDisplay.PacmanGraphics, textDisplay.PacmanGraphics,
+    ...) so that it is drawn by a renderer running mode 'thread' or 'process'.
+    The default mode is 'process' for Tk displays and 'thread' for others.
+    """
+
+    def __init__(self, display, mode=None, maxLag=2):
+        if mode is None:
+            mode = 'process' if usesTk(display) else 'thread'
+        if mode not in ('thread', 'process'):
+            raise Exception('Unknown render mode: ' + str(mode))
+        if mode == 'thread' and usesTk(display):
+            raise Exception('Tk displays cannot be drawn from a thread; use process mode')
+        self.display = display
+        self.mode = mode
+        self.maxLag = maxLag
+        self.renderer = None
+        self.sentAgents = []
+        self.framesDropped = 0
+
+    def start(self):
+        if self.mode == 'thread':
+            self.messages, self.acks = queue.Queue(), queue.Queue()
+            self.renderer = threading.Thread(target=render, name='renderer',
+                                             args=(self.display, self.messages, self.acks, self.maxLag))
+        else:
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context('fork' if 'fork' in methods else None)
+            self.messages, self.acks = context.Queue(), context.Queue()
+            self.renderer = context.Process(target=render, name='renderer',
+                                            args=(self.display, self.messages, self.acks, self.maxLag))
+        self.renderer.daemon = True
+        self.renderer.start()
+
+    def initialize(self, state, isBlue=False):
+        if self.renderer is None:
+            self.start()
+        self.sentAgents = [agentSnapshot(agentState) for agentState in state.agentStates]
+        self.messages.put(('initialize', state.deepCopy() if self.mode == 'thread' else state, isBlue))
+
+    def update(self, state):
+        changed = []
+        for index, agentState in enumerate(state.agentStates):
+            snapshot = agentSnapshot(agentState)
+            if snapshot != self.sentAgents[index]:
+                changed.append((index, snapshot))
+                self.sentAgents[index] = snapshot
+        self.messages.put(('update', (state._agentMoved, changed, state._foodEaten,
+                                      state._capsuleEaten, state.score, state._win, state._lose)))
+
+    def finish(self):
+        """
+        Waits until the renderer has drawn everything sent so far.
+        """
+        self.messages.put(('finish',))
+        while self.renderer.is_alive():
+            try:
+                self.framesDropped = self.acks.get(timeout=0.1)
+                return
+            except queue.Empty:
+                pass
+
+    def checkNullDisplay(self):
+        return False
+
+
+def applyDiff(state, diff):
+    """
+    Brings the renderer's copy of the state up to date with one update.
+    Changed agents get new AgentState objects, since displays keep the
+    previous ones to know where an agent was drawn.
+    """
+    agentMoved, changed, foodEaten, capsuleEaten, score, win, lose = diff
+    for index, (configuration, scaredTimer, isPacman) in changed:
+        agentState = state.agentStates[index].copy()
+        agentState.configuration = configuration
+        agentState.scaredTimer = scaredTimer
+        agentState.isPacman = isPacman
+        state.agentStates[index] = agentState
+    if foodEaten is not None:
+        state.food[foodEaten[0]][foodEaten[1]] = False
+    if capsuleEaten is not None:
+        state.capsules.remove(capsuleEaten)
+    state._agentMoved = agentMoved
+    state._foodEaten = foodEaten
+    state._capsuleEaten = capsuleEaten
+    state.score = score
+    state._win = win
+    state._lose = lose
+
+
+def movesToDraw(updates, maxLag):
+    """
+    Returns the positions in updates (a list of diffs waiting together) that
+    must be drawn: all of them when at most maxLag are waiting, otherwise the
+    last move of each agent and every move that eats something or ends the
+    game.
+    """
+    if len(updates) <= maxLag:
+        return set(range(len(updates)))
+    draw = set()
+    seen = set()
+    for position in range(len(updates) - 1, -1, -1):
+        agentMoved, changed, foodEaten, capsuleEaten, score, win, lose = updates[position]
+        if agentMoved not in seen or foodEaten is not None or capsuleEaten is not None or win or lose:
+            draw.add(position)
+        seen.add(agentMoved)
+    return draw
+
+
+def render(display, messages, acks, maxLag):
+    """
+    The renderer's loop: takes every waiting message, then draws them.
+    After an error in the display it keeps acknowledging finish() calls so
+    the game is not held up.
+    """
+    state = None
+    broken = False
+    framesDropped = 0
+    while True:
+        batch = [messages.get()]
+        while True:
+            try:
+                batch.append(messages.get_nowait())
+            except queue.Empty:
+                break
+        updates = [message[1] for message in batch if message[0] == 'update']
+        draw = movesToDraw(updates, maxLag)
+        framesDropped += len(updates) - len(draw)
+        position = 0
+        for message in batch:
+            try:
+                if message[0] == 'initialize':
+                    state = message[1]
+                    if not broken:
+                        display.initialize(state, message[2])
+                elif message[0] == 'update':
+                    position += 1
+                    applyDiff(state, message[1])
+                    if position - 1 in draw and not broken:
+                        display.update(state)
+                elif message[0] == 'finish':
+                    if not broken:
+                        display.finish()
+                    acks.put(framesDropped)
+            except (Exception, SystemExit):
+                if not broken:
+                    traceback.print_exc(file=sys.stderr)
+                broken = True
+                if message[0] == 'finish':
+                    acks.put(framesDropped)
@@ -22,10 +22,6 @@ import sys
 import projectParams
 import random
 random.seed(0)
-try:
-    from pacman import GameState
-except:
-    pass
 
 # register arguments and set default values
 def readCommand(argv):
@@ -81,6 +77,45 @@ def readCommand(argv):
                       dest='noGraphics',
                       action='store_true',
                       help='No graphics display for pacman games.')
+    parser.add_option('--startup-report',
+                      dest='startupReport',
+                      action='store_true',
+                      default=False,
+                      help='Print where the startup time of this command goes (python -X importtime) instead of running it')
+    parser.add_option('--profile',
+                      dest='profile',
+                      default=None,
+                      metavar='FILE',
+                      help='Profile the grading run and write the profile to FILE')
+    parser.add_option('--profiler',
+                      dest='profiler',
+                      default='cprofile',
+                      choices=['cprofile', 'sample'],
+                      help='Profiler used by --profile: cprofile (pstats output) or sample (collapsed stacks)')
+    parser.add_option('--jobs', '-j',
+                      dest='jobs',
+                      type='int',
+                      default=1,
+                      help='Run test cases in this many worker processes (implies --no-graphics)')
+    parser.add_option('--early-stop',
+                      dest='earlyStop',
+                      action='store_true',
+                      default=False,
+                      help='Stop playing games in game-playing tests once their points are decided')
+    parser.add_option('--cache',
+                      dest='cache',
+                      action='store_true',
+                      default=False,
+                      help='Reuse results of test cases whose code, .test and .solution files are unchanged')
+    parser.add_option('--cache-dir',
+                      dest='cacheDir',
+                      default='.autograder_cache',
+                      help='Directory of the --cache results (default %default)')
+    parser.add_option('--force-rerun',
+                      dest='forceRerun',
+                      action='store_true',
+                      default=False,
+                      help='With --cache, run every test case again and refresh its cached result')
     (options, args) = parser.parse_args(argv)
     return options
 
@@ -134,9 +169,6 @@ def loadModuleString(moduleSource):
     return tmp
 
 
-import py_compile
-
-
 def loadModuleFile(moduleName, filePath):
     spec = importlib.util.spec_from_file_location(moduleName, filePath)
     module = importlib.util.module_from_spec(spec)
@@ -178,8 +210,6 @@ ERROR_HINT_MAP = {
     }
 }
 
-import pprint
-
 
 def splitStrings(d):
     d2 = dict(d)
@@ -193,6 +223,7 @@ def splitStrings(d):
 
 
 def printTest(testDict, solutionDict):
+    import pprint
     pp = pprint.PrettyPrinter(indent=4)
     print("Test case:")
     for line in testDict["__raw_lines__"]:
@@ -253,10 +284,152 @@ def getTestSubdirs(testParser, testRoot, questionToGrade):
     return sorted(os.listdir(testRoot))
 
 
+class ResultCache:
+    """
+    Stores the recorded results of test cases (see grading.runRecorded) on
+    disk.  A test case's key hashes the source of every loaded module in
+    moduleDict (student code and projectTestClasses) together with the
+    contents of its .test and .solution files, so a result is reused only
+    while none of those change, and only by runs with the same variant.
+    """
+    CACHE_VERSION = 2
+
+    def __init__(self, cacheDir, moduleDict, forceRerun=False, variant=''):
+        import hashlib
+        self.cacheDir = cacheDir
+        self.forceRerun = forceRerun
+        self.hits = 0
+        self.misses = 0
+        # variant separates runs whose options change test output
+        code = hashlib.sha1(('%d %d.%d %s' % ((self.CACHE_VERSION,) + sys.version_info[:2] + (variant,))).encode())
+        for name in sorted(moduleDict):
+            code.update(name.encode())
+            with open(moduleDict[name].__file__, 'rb') as handle:
+                code.update(hashlib.sha1(handle.read()).digest())
+        self.codeHash = code.hexdigest()
+
+    def key(self, testFile, solutionFile):
+        import hashlib
+        key = hashlib.sha1(self.codeHash.encode())
+        for path in [testFile, solutionFile]:
+            if os.path.exists(path):
+                with open(path, 'rb') as handle:
+                    key.update(hashlib.sha1(handle.read()).digest())
+            else:
+                key.update(b'missing')
+        return key.hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.cacheDir, key + '.pickle')
+
+    def load(self, key):
+        import pickle
+        if self.forceRerun or not os.path.exists(self.path(key)):
+            return None
+        try:
+            with open(self.path(key), 'rb') as handle:
+                return pickle.load(handle)
+        except Exception:
+            return None
+
+    def store(self, key, record):
+        import pickle
+        if record[2] is not None:
+            # Do not remember crashes, they may be timeouts or flaky
+            return
+        if not os.path.isdir(self.cacheDir):
+            os.makedirs(self.cacheDir)
+        temporary = '%s.%d.tmp' % (self.path(key), os.getpid())
+        with open(temporary, 'wb') as handle:
+            pickle.dump(record, handle)
+        os.replace(temporary, self.path(key))
+
+    def printSummary(self):
+        total = self.hits + self.misses
+        print('Result cache: %d of %d test cases answered from %s' % (self.hits, total, self.cacheDir))
+
+
+# Test case thunks run by the worker processes of scheduleTestCases
+PARALLEL_THUNKS = []
+
+
+def runParallelThunk(index):
+    return grading.runRecorded(PARALLEL_THUNKS[index])
+
+
+def scheduleTestCases(questions, jobs=1, cache=None, testKeys={}):
+    """
+    Replaces the thunks of the questions' test cases with ones that replay a
+    recorded result (see grading.runRecorded), so grading and its output
+    still happen in order in this process.  Results come from the cache if
+    one is given and has them; the other test cases run when graded if jobs
+    is 1, and otherwise in a pool of jobs forked worker processes.  A test
+    case is only started once the one jobs places before it in its question
+    is being graded, so a question that stops early (a failed prerequisite,
+    PartialCreditQuestion's first failure, an exception) leaves at most
+    jobs - 1 test cases run for nothing.  Returns the pool, or None if none
+    was started.
+    """
+    import multiprocessing
+    global PARALLEL_THUNKS
+    misses = []
+    for question in questions:
+        for i, (testCase, thunk) in enumerate(question.testCases):
+            record = cache.load(testKeys[testCase]) if cache is not None else None
+            if record is not None:
+                cache.hits += 1
+                question.testCases[i] = (testCase, makeReplay(lambda record=record: record))
+            else:
+                misses.append((question, i, testCase, thunk))
+    if cache is not None:
+        cache.misses += len(misses)
+
+    pool = None
+    if jobs > 1 and 'fork' not in multiprocessing.get_all_start_methods():
+        print('Note: --jobs needs fork(); running test cases serially')
+    elif jobs > 1 and len(misses) > 0:
+        PARALLEL_THUNKS = [thunk for question, i, testCase, thunk in misses]
+        pool = multiprocessing.get_context('fork').Pool(jobs)
+        # The positions in misses of each question's test cases, in order
+        questionMisses = {}
+        for n, miss in enumerate(misses):
+            questionMisses.setdefault(id(miss[0]), []).append(n)
+        started = {}
+
+        def fetchRecord(n):
+            order = questionMisses[id(misses[n][0])]
+            position = order.index(n)
+            for m in order[position:position + jobs]:
+                if m not in started:
+                    started[m] = pool.apply_async(runParallelThunk, (m,))
+            return started[n].get()
+
+        getters = [lambda n=n: fetchRecord(n) for n in range(len(misses))]
+    if pool is None:
+        getters = [lambda thunk=thunk: grading.runRecorded(thunk) for question, i, testCase, thunk in misses]
+
+    for (question, i, testCase, thunk), getRecord in zip(misses, getters):
+        store = None
+        if cache is not None:
+            store = lambda record, key=testKeys[testCase]: cache.store(key, record)
+        question.testCases[i] = (testCase, makeReplay(getRecord, store))
+    return pool
+
+
+def makeReplay(getRecord, store=None):
+    def replay(grades):
+        record = getRecord()
+        if store is not None:
+            store(record)
+        return grading.replayRecorded(grades, record)
+    return replay
+
+
 # evaluate student code
 def evaluate(generateSolutions, testRoot, moduleDict, exceptionMap=ERROR_HINT_MAP,
              edxOutput=False, muteOutput=False, gsOutput=False,
-             printTestCase=False, questionToGrade=None, display=None):
+             printTestCase=False, questionToGrade=None, display=None, jobs=1,
+             cache=None):
     # imports of testbench code.  note that the testClasses import must follow
     # the import of student code due to dependencies
     import testParser
@@ -266,6 +439,8 @@ def evaluate(generateSolutions, testRoot, moduleDict, exceptionMap=ERROR_HINT_MA
 
     questions = []
     questionDicts = {}
+    questionObjects = []
+    testKeys = {}
     test_subdirs = getTestSubdirs(testParser, testRoot, questionToGrade)
     for q in test_subdirs:
         subdir_path = os.path.join(testRoot, q)
@@ -294,25 +469,27 @@ def evaluate(generateSolutions, testRoot, moduleDict, exceptionMap=ERROR_HINT_MA
             testClass = getattr(projectTestClasses, testDict['class'])
             testCase = testClass(question, testDict)
 
-            def makefun(testCase, solution_file):
+            def makefun(testCase, testDict, solution_file):
                 if generateSolutions:
                     # write solution file to disk
                     return lambda grades: testCase.writeSolution(moduleDict, solution_file)
                 else:
                     # read in solution dictionary and pass as an argument
-                    testDict = testParser.TestParser(test_file).parse()
                     solutionDict = testParser.TestParser(solution_file).parse()
                     if printTestCase:
                         return lambda grades: printTest(testDict, solutionDict) or testCase.execute(grades, moduleDict, solutionDict)
                     else:
                         return lambda grades: testCase.execute(grades, moduleDict, solutionDict)
-            question.addTestCase(testCase, makefun(testCase, solution_file))
+            question.addTestCase(testCase, makefun(testCase, testDict, solution_file))
+            if cache is not None:
+                testKeys[testCase] = cache.key(test_file, solution_file)
 
         # Note extra function is necessary for scoping reasons
         def makefun(question):
             return lambda grades: question.execute(grades)
         setattr(sys.modules[__name__], q, makefun(question))
         questions.append((q, question.getMaxPoints()))
+        questionObjects.append(question)
 
     grades = grading.Grades(projectParams.PROJECT_NAME, questions,
                             gsOutput=gsOutput, edxOutput=edxOutput, muteOutput=muteOutput)
@@ -321,25 +498,80 @@ def evaluate(generateSolutions, testRoot, moduleDict, exceptionMap=ERROR_HINT_MA
             for prereq in questionDicts[q].get('depends', '').split():
                 grades.addPrereq(q, prereq)
 
-    grades.grade(sys.modules[__name__], bonusPic=projectParams.BONUS_PIC)
+    pool = None
+    if generateSolutions:
+        cache = None
+    elif jobs > 1 or cache is not None:
+        pool = scheduleTestCases(questionObjects, jobs, cache, testKeys)
+    try:
+        grades.grade(sys.modules[__name__], bonusPic=projectParams.BONUS_PIC)
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+    if cache is not None:
+        cache.printSummary()
     return grades.points
 
 
+class LazyGraphics:
+    """
+    Stands in for graphicsDisplay.PacmanGraphics, importing it (and tkinter)
+    only when a test first uses the display.  Falls back to NullGraphics
+    when tkinter is missing.
+    """
+
+    def __init__(self, zoom=1, frameTime=.05):
+        self.zoom = zoom
+        self.frameTime = frameTime
+        self.display = None
+
+    def __getattr__(self, name):
+        if self.display is None:
+            try:
+                import graphicsDisplay
+                self.display = graphicsDisplay.PacmanGraphics(self.zoom, frameTime=self.frameTime)
+            except ImportError:
+                import textDisplay
+                self.display = textDisplay.NullGraphics()
+        return getattr(self.display, name)
+
+
+def usesGraphics(graphicsByDefault, options=None):
+    if options is not None and (options.noGraphics or options.jobs > 1):
+        return False
+    return graphicsByDefault
+
+
 def getDisplay(graphicsByDefault, options=None):
-    graphics = graphicsByDefault
-    if options is not None and options.noGraphics:
-        graphics = False
-    if graphics:
-        try:
-            import graphicsDisplay
-            return graphicsDisplay.PacmanGraphics(1, frameTime=.05)
-        except ImportError:
-            pass
+    if usesGraphics(graphicsByDefault, options):
+        return LazyGraphics(1, frameTime=.05)
     import textDisplay
     return textDisplay.NullGraphics()
 
 
+def cacheVariant(options):
+    """
+    Names the options that change what a test case prints or records, so
+    that runs with different ones never share cached results.  Games shown
+    on screen are slower, which can change timeouts.
+    """
+    variant = []
+    if options.earlyStop:
+        variant.append('early-stop')
+    if options.printTestCase:
+        variant.append('print-tests')
+    if usesGraphics(options.gradeQuestion != None, options):
+        variant.append('graphics')
+    return ' '.join(variant)
+
+
 if __name__ == '__main__':
+    if '--startup-report' in sys.argv[1:]:
+        # Checked before readCommand, so that it also reports on --help
+        import profiling
+        profiling.startupReport(sys.argv[0], [arg for arg in sys.argv[1:] if arg != '--startup-report'])
+        sys.exit(0)
     options = readCommand(sys.argv)
     if options.generateSolutions:
         confirmGenerate()
@@ -359,12 +591,28 @@ if __name__ == '__main__':
     moduleName = re.match('.*?([^/]*)\.py', options.testCaseCode).group(1)
     moduleDict['projectTestClasses'] = loadModuleFile(
         moduleName, os.path.join(options.codeRoot, options.testCaseCode))
-
-    if options.runTest != None:
-        runTest(options.runTest, moduleDict, printTestCase=options.printTestCase,
-                display=getDisplay(True, options))
+    if options.earlyStop:
+        moduleDict['projectTestClasses'].EARLY_STOPPING = True
+
+    cache = None
+    if options.cache:
+        cache = ResultCache(options.cacheDir, moduleDict, options.forceRerun, cacheVariant(options))
+
+    def grade():
+        if options.runTest != None:
+            if options.jobs > 1:
+                print('Note: --jobs has no effect with --test, which runs a single test case')
+            runTest(options.runTest, moduleDict, printTestCase=options.printTestCase,
+                    display=getDisplay(True, options))
+        else:
+            evaluate(options.generateSolutions, options.testRoot, moduleDict,
+                     gsOutput=options.gsOutput,
+                     edxOutput=options.edxOutput, muteOutput=options.muteOutput, printTestCase=options.printTestCase,
+                     questionToGrade=options.gradeQuestion, display=getDisplay(options.gradeQuestion != None, options),
+                     jobs=options.jobs, cache=cache)
+
+    if options.profile is None:
+        grade()
     else:
-        evaluate(options.generateSolutions, options.testRoot, moduleDict,
-                 gsOutput=options.gsOutput,
-                 edxOutput=options.edxOutput, muteOutput=options.muteOutput, printTestCase=options.printTestCase,
-                 questionToGrade=options.gradeQuestion, display=getDisplay(options.gradeQuestion != None, options))
+        import profiling
+        profiling.runProfiled(grade, options.profile, options.profiler)
@@ -0,0 +1,508 @@
+# benchmark.py
+# ------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+Benchmark.py times the hot paths of the Pacman engine and the search agents.
+
+  micro:  single engine operations (generateSuccessor, getLegalActions,
+          Grid.copy/count/__hash__, GameStateData.deepCopy) on the starting
+          state of a layout.
+  macro:  getAction of each search agent at a fixed depth on a fixed set of
+          states from every layout.
+  scaling (--scaling): getAction of each agent on mazes of growing size made
+          by mazeGenerator, with each number of ghosts, reported (and
+          plotted) as time per move against board size.
+  queues (--queues): Dijkstra over the open cells of generated mazes, with
+          random step costs, using util.PriorityQueue and
+          util.IndexedPriorityQueue.
+  startup (--startup): wall time of short commands (pacman.py, autograder.py)
+          run in a new interpreter, against a bare 'python -c pass'.
+
+Every benchmark is warmed up, then timed several times; the JSON written
+with --output can be compared against a run from another commit with
+--compare.
+
+  python benchmark.py --output before.json
+  python benchmark.py --output after.json --compare before.json
+  python benchmark.py --scaling -p AlphaBetaAgent --plot scaling.png
+  python benchmark.py --queues --queueSizes 447x447 --maxLinearNodes 200000
+  python benchmark.py --startup --repeat 20
+"""
+
+import json
+import os
+import platform
+import random
+import sys
+import time
+
+import layout
+import mazeGenerator
+import pacman
+import util
+from pacman import default
+
+MACRO_AGENTS = ['MinimaxAgent', 'AlphaBetaAgent', 'ExpectimaxAgent']
+SCALING_SIZES = '11x7,21x11,41x21,81x41,161x81'
+SCALING_GHOSTS = '1,2,4'
+# The largest has about 100k open cells
+QUEUE_SIZES = '45x45,141x141,377x377'
+QUEUE_CLASSES = ['PriorityQueue', 'IndexedPriorityQueue']
+STARTUP_COMMANDS = [('python', ['-c', 'pass']),
+                    ('pacman.py --help', ['pacman.py', '--help']),
+                    ('pacman.py testClassic', ['pacman.py', '-q', '-p', 'GreedyAgent', '-l', 'testClassic']),
+                    ('autograder.py --help', ['autograder.py', '--help']),
+                    ('autograder.py q1', ['autograder.py', '--no-graphics', '--mute', '-q', 'q1'])]
+
+
+def timeCall(fn, number, repeat, warmup):
+    """
+    Calls fn() warmup times, then times repeat batches of number calls and
+    returns per-call statistics in seconds.
+    """
+    for i in range(warmup):
+        fn()
+    timings = []
+    for r in range(repeat):
+        start = time.perf_counter()
+        for i in range(number):
+            fn()
+        timings.append((time.perf_counter() - start) / number)
+    timings.sort()
+    return {'number': number, 'repeat': repeat,
+            'min': timings[0], 'median': timings[len(timings) // 2],
+            'mean': sum(timings) / len(timings), 'max': timings[-1]}
+
+
+def startState(layoutName):
+    """
+    Returns the starting state of a layout given by name or as a Layout.
+    """
+    if isinstance(layoutName, layout.Layout):
+        lay = layoutName
+    else:
+        lay = layout.getLayout(layoutName)
+        if lay is None:
+            raise Exception("The layout " + layoutName + " cannot be found")
+    state = pacman.GameState()
+    state.initialize(lay, lay.getNumGhosts())
+    return state
+
+
+def sampleStates(layoutName, numStates, seed):
+    """
+    Returns the first numStates Pacman-to-move states of a game played by
+    random legal moves from a fixed seed, so every run sees the same states.
+    """
+    rng = random.Random(seed)
+    state = startState(layoutName)
+    states = []
+    while len(states) < numStates and not (state.isWin() or state.isLose()):
+        for agentIndex in range(state.getNumAgents()):
+            if agentIndex == 0:
+                states.append(state)
+            legal = state.getLegalActions(agentIndex)
+            state = state.generateSuccessor(agentIndex, rng.choice(legal))
+            if state.isWin() or state.isLose():
+                break
+    return states
+
+
+########################
+# Micro benchmarks     #
+########################
+
+def microBenchmarks(layoutName):
+    """
+    Returns a list of (name, fn, number) for the engine operations on the
+    starting state of layoutName.
+    """
+    state = startState(layoutName)
+    pacmanAction = state.getLegalActions(0)[0]
+    ghostState = state.generateSuccessor(0, pacmanAction)
+    ghostAction = ghostState.getLegalActions(1)[0]
+    food = state.getFood()
+
+    return [
+        ('GameState.generateSuccessor[pacman]',
+         lambda: state.generateSuccessor(0, pacmanAction), 2000),
+        ('GameState.generateSuccessor[ghost]',
+         lambda: ghostState.generateSuccessor(1, ghostAction), 2000),
+        ('GameState.getLegalActions[pacman]',
+         lambda: state.getLegalActions(0), 5000),
+        ('GameState.getLegalActions[ghost]',
+         lambda: ghostState.getLegalActions(1), 5000),
+        ('Grid.copy', food.copy, 5000),
+        ('Grid.count', food.count, 5000),
+        ('Grid.__hash__', food.__hash__, 2000),
+        ('GameStateData.deepCopy', state.data.deepCopy, 1000),
+    ]
+
+
+def runMicro(layoutNames, repeat, warmup, verbose=True):
+    results = {}
+    for layoutName in layoutNames:
+        for name, fn, number in microBenchmarks(layoutName):
+            key = '%s/%s' % (name, layoutName)
+            results[key] = timeCall(fn, number, repeat, warmup)
+            pacman.GameState.getAndResetExplored()
+            if verbose:
+                print('%-50s %10.2f us' % (key, results[key]['median'] * 1e6))
+    return results
+
+
+########################
+# Macro benchmarks     #
+########################
+
+def runMacro(agentNames, layoutNames, depth, numStates, seed, repeat, warmup, verbose=True):
+    results = {}
+    for layoutName in layoutNames:
+        states = sampleStates(layoutName, numStates, seed)
+        for agentName in agentNames:
+            agent = pacman.loadAgent(agentName, True)(depth=str(depth))
+
+            def searchAll():
+                for state in states:
+                    agent.getAction(state)
+                # generateSuccessor records every state it creates
+                pacman.GameState.getAndResetExplored()
+            key = '%s[depth=%d]/%s' % (agentName, depth, layoutName)
+            stats = timeCall(searchAll, 1, repeat, warmup)
+            # Report per getAction call rather than per batch of states
+            for field in ['min', 'median', 'mean', 'max']:
+                stats[field] /= len(states)
+            stats['states'] = len(states)
+            results[key] = stats
+            if verbose:
+                print('%-50s %10.2f ms' % (key, stats['median'] * 1e3))
+    return results
+
+
+########################
+# Scaling benchmarks   #
+########################
+
+def parseSizes(sizes):
+    """
+    Parses '21x11,41x21' into [(21, 11), (41, 21)].
+    """
+    result = []
+    for size in sizes.split(','):
+        width, height = size.lower().split('x')
+        result.append((int(width), int(height)))
+    return result
+
+
+def runScaling(agentNames, sizes, depth, numStates, seed, repeat, warmup, ghostCounts=[2],
+               verbose=True):
+    """
+    Times getAction of each agent on a generated maze of every size with
+    every number of ghosts.  Results are keyed like the macro benchmarks and
+    also record the board size and ghosts, so they can be plotted.
+    """
+    results = {}
+    for numGhosts in ghostCounts:
+        for width, height in sizes:
+            lines = mazeGenerator.generateMaze(width, height, numGhosts=numGhosts, seed=seed)
+            lay = layout.layoutFromText(lines)
+            states = sampleStates(lay, numStates, seed)
+            for agentName in agentNames:
+                agent = pacman.loadAgent(agentName, True)(depth=str(depth))
+
+                def searchAll():
+                    for state in states:
+                        agent.getAction(state)
+                    pacman.GameState.getAndResetExplored()
+                key = '%s[depth=%d]/maze%dx%d/ghosts%d' % (agentName, depth, width, height, numGhosts)
+                stats = timeCall(searchAll, 1, repeat, warmup)
+                for field in ['min', 'median', 'mean', 'max']:
+                    stats[field] /= len(states)
+                stats.update({'states': len(states), 'agent': agentName, 'ghosts': numGhosts,
+                              'width': width, 'height': height, 'cells': width * height})
+                results[key] = stats
+                if verbose:
+                    print('%-50s %10.2f ms' % (key, stats['median'] * 1e3))
+    return results
+
+
+def plotScaling(results, outputPath=None, out=sys.stdout):
+    """
+    Plots time per move against board cells for every agent and number of
+    ghosts.  Writes an
+    image with matplotlib when outputPath is given and matplotlib is
+    installed; otherwise prints a text chart.
+    """
+    series = {}
+    for stats in results.values():
+        name = '%s, ghosts=%d' % (stats['agent'], stats['ghosts'])
+        series.setdefault(name, []).append((stats['cells'], stats['median']))
+    for points in series.values():
+        points.sort()
+
+    if outputPath is not None:
+        try:
+            import matplotlib
+            matplotlib.use('Agg')
+            import matplotlib.pyplot as plt
+        except ImportError:
+            print('matplotlib is not installed; printing a text chart instead', file=out)
+        else:
+            plt.figure()
+            for name in sorted(series):
+                cells = [c for c, t in series[name]]
+                millis = [t * 1e3 for c, t in series[name]]
+                plt.loglog(cells, millis, marker='o', label=name)
+            plt.xlabel('board cells')
+            plt.ylabel('time per move (ms)')
+            plt.legend()
+            plt.savefig(outputPath)
+            print('Scaling plot written to %s' % outputPath, file=out)
+            return
+
+    longest = max([t for points in series.values() for c, t in points] + [0])
+    for name in sorted(series):
+        print('\n%s: time per move against board cells' % name, file=out)
+        for cells, seconds in series[name]:
+            bar = '#' * int(round(40 * seconds / longest)) if longest > 0 else ''
+            print('  %8d %10.2f ms %s' % (cells, seconds * 1e3, bar), file=out)
+
+
+########################
+# Queue benchmarks     #
+########################
+
+def mazeGraph(width, height, seed):
+    """
+    Returns (start, costs) for a generated maze: costs maps every open cell
+    to the cost of stepping onto it, a random integer from 1 to 9.
+    """
+    lines = mazeGenerator.generateMaze(width, height, corridorDensity=0.5, numGhosts=0,
+                                       numCapsules=0, seed=seed)
+    rng = random.Random(seed)
+    costs = {}
+    start = None
+    for row, line in enumerate(lines):
+        for x, char in enumerate(line):
+            if char != '%':
+                costs[(x, height - 1 - row)] = rng.randint(1, 9)
+                if char == 'P':
+                    start = (x, height - 1 - row)
+    return start, costs
+
+
+def dijkstra(start, costs, queueClass):
+    """
+    Returns the cost of the cheapest path from start to every cell, using
+    the queue's update as decrease-key.
+    """
+    distances = {start: 0}
+    done = set()
+    queue = queueClass()
+    queue.push(start, 0)
+    while not queue.isEmpty():
+        cell = queue.pop()
+        if cell in done:
+            continue
+        done.add(cell)
+        x, y = cell
+        for neighbor in ((x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)):
+            if neighbor not in costs or neighbor in done:
+                continue
+            distance = distances[cell] + costs[neighbor]
+            if distance < distances.get(neighbor, float('inf')):
+                distances[neighbor] = distance
+                queue.update(neighbor, distance)
+    return distances
+
+
+def checkQueue(queueClass):
+    """
+    Raises an exception unless pushing an item again with a worse priority
+    leaves the better one in place, which uniform cost search relies on.
+    """
+    queue = queueClass()
+    queue.push('a', 1)
+    queue.push('b', 2)
+    queue.push('a', 3)
+    if queue.pop() != 'a' or queue.pop() != 'b':
+        raise Exception('%s lost the better priority of a pushed item' % queueClass.__name__)
+
+
+def runQueues(sizes, seed, repeat, warmup, maxLinearNodes=20000, verbose=True):
+    """
+    Times a full Dijkstra search on a maze of every size with each queue.
+    PriorityQueue, whose update is linear, is skipped on graphs with more
+    than maxLinearNodes nodes.
+    """
+    for className in QUEUE_CLASSES:
+        checkQueue(getattr(util, className))
+    results = {}
+    for width, height in sizes:
+        start, costs = mazeGraph(width, height, seed)
+        expected = None
+        for className in QUEUE_CLASSES:
+            key = 'dijkstra[%s]/maze%dx%d' % (className, width, height)
+            if className == 'PriorityQueue' and len(costs) > maxLinearNodes:
+                if verbose:
+                    print('%-50s %10s    (%d nodes)' % (key, 'skipped', len(costs)))
+                continue
+            queueClass = getattr(util, className)
+            distances = dijkstra(start, costs, queueClass)
+            if expected is not None and distances != expected:
+                raise Exception('%s found different distances' % className)
+            expected = distances
+            stats = timeCall(lambda: dijkstra(start, costs, queueClass), 1, repeat, warmup)
+            stats.update({'queue': className, 'nodes': len(costs)})
+            results[key] = stats
+            if verbose:
+                print('%-50s %10.2f ms   (%d nodes)' % (key, stats['median'] * 1e3, len(costs)))
+    return results
+
+
+def runStartup(repeat, warmup, verbose=True):
+    """
+    Times each of STARTUP_COMMANDS from the start of a new interpreter to
+    its exit, with the output discarded.
+    """
+    import subprocess
+    directory = os.path.dirname(os.path.abspath(__file__))
+
+    def runner(args):
+        def run():
+            subprocess.run([sys.executable] + args, cwd=directory, check=True,
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        return run
+
+    results = {}
+    for name, args in STARTUP_COMMANDS:
+        key = 'startup/' + name
+        stats = timeCall(runner(args), 1, repeat, warmup)
+        results[key] = stats
+        if verbose:
+            print('%-50s %10.2f ms' % (key, stats['median'] * 1e3))
+    return results
+
+
+def metadata(options):
+    return {'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'platform': platform.platform(),
+            'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'options': vars(options)}
+
+
+def compare(old, new, out=sys.stdout):
+    """
+    Prints the median of every benchmark present in both result files along
+    with the new/old ratio.
+    """
+    print('\n%-50s %12s %12s %8s' % ('Benchmark', 'old', 'new', 'ratio'), file=out)
+    for group in ['micro', 'macro', 'scaling', 'queues', 'startup']:
+        oldGroup, newGroup = old.get(group, {}), new.get(group, {})
+        for key in sorted(newGroup):
+            if key not in oldGroup:
+                continue
+            o, n = oldGroup[key]['median'], newGroup[key]['median']
+            print('%-50s %12.3g %12.3g %8.2f' % (key, o, n, n / o if o > 0 else float('inf')), file=out)
+
+
+def readCommand(argv):
+    from optparse import OptionParser
+    usageStr = """
+    USAGE:      python benchmark.py <options>
+    EXAMPLES:   (1) python benchmark.py --micro-only -l smallClassic,originalClassic
+                (2) python benchmark.py --depth 3 --output results.json
+                (3) python benchmark.py --output new.json --compare old.json
+                (4) python benchmark.py --scaling -p AlphaBetaAgent --sizes 41x21,161x81 --scalingGhosts 1,3
+                (5) python benchmark.py --queues
+                (6) python benchmark.py --startup --output startup.json
+    """
+    parser = OptionParser(usageStr)
+    parser.add_option('-l', '--layouts', dest='layouts',
+                      help=default('comma separated layouts'),
+                      default='testClassic,minimaxClassic,smallClassic,mediumClassic,originalClassic')
+    parser.add_option('-p', '--agents', dest='agents',
+                      help=default('comma separated search agents for the macro benchmarks'),
+                      default=','.join(MACRO_AGENTS))
+    parser.add_option('-d', '--depth', dest='depth', type='int',
+                      help=default('search depth for the macro benchmarks'), default=2)
+    parser.add_option('--states', dest='numStates', type='int',
+                      help=default('states searched per macro benchmark'), default=5)
+    parser.add_option('-s', '--seed', dest='seed', type='int',
+                      help=default('seed used to pick the macro benchmark states'), default=0)
+    parser.add_option('-r', '--repeat', dest='repeat', type='int',
+                      help=default('timed repetitions of each benchmark'), default=5)
+    parser.add_option('-w', '--warmup', dest='warmup', type='int',
+                      help=default('untimed warmup calls of each benchmark'), default=1)
+    parser.add_option('--micro-only', dest='microOnly', action='store_true', default=False,
+                      help='Only run the engine micro benchmarks')
+    parser.add_option('--macro-only', dest='macroOnly', action='store_true', default=False,
+                      help='Only run the agent macro benchmarks')
+    parser.add_option('--scaling', dest='scaling', action='store_true', default=False,
+                      help='Only run the scaling benchmarks on generated mazes')
+    parser.add_option('--sizes', dest='sizes',
+                      help=default('comma separated WIDTHxHEIGHT maze sizes for --scaling'),
+                      default=SCALING_SIZES)
+    parser.add_option('--plot', dest='plot', default=None,
+                      help='Write the scaling plot to this image (needs matplotlib)')
+    parser.add_option('--scalingGhosts', dest='scalingGhosts',
+                      help=default('comma separated numbers of ghosts for --scaling'),
+                      default=SCALING_GHOSTS)
+    parser.add_option('--queues', dest='queues', action='store_true', default=False,
+                      help='Only run the priority queue benchmarks')
+    parser.add_option('--queueSizes', dest='queueSizes',
+                      help=default('comma separated WIDTHxHEIGHT maze sizes for --queues'),
+                      default=QUEUE_SIZES)
+    parser.add_option('--maxLinearNodes', dest='maxLinearNodes', type='int',
+                      help=default('largest graph to search with util.PriorityQueue'), default=20000)
+    parser.add_option('--startup', dest='startup', action='store_true', default=False,
+                      help='Only run the cold start benchmarks')
+    parser.add_option('-o', '--output', dest='output', default=None,
+                      help='Write results as JSON to this file')
+    parser.add_option('--compare', dest='compare', default=None,
+                      help='Compare the results against an earlier JSON file')
+    options, otherjunk = parser.parse_args(argv)
+    if len(otherjunk) != 0:
+        raise Exception('Command line input not understood: ' + str(otherjunk))
+    return options
+
+
+if __name__ == '__main__':
+    options = readCommand(sys.argv[1:])
+    layoutNames = options.layouts.split(',')
+    results = {'meta': metadata(options)}
+    if options.scaling:
+        results['scaling'] = runScaling(options.agents.split(','), parseSizes(options.sizes),
+                                        options.depth, options.numStates, options.seed,
+                                        options.repeat, options.warmup,
+                                        [int(n) for n in options.scalingGhosts.split(',')])
+        plotScaling(results['scaling'], options.plot)
+    if options.queues:
+        results['queues'] = runQueues(parseSizes(options.queueSizes), options.seed, options.repeat,
+                                      options.warmup, options.maxLinearNodes)
+    if options.startup:
+        results['startup'] = runStartup(options.repeat, options.warmup)
+    special = options.scaling or options.queues or options.startup
+    if not options.macroOnly and not special:
+        results['micro'] = runMicro(layoutNames, options.repeat, options.warmup)
+    if not options.microOnly and not special:
+        results['macro'] = runMacro(options.agents.split(','), layoutNames, options.depth,
+                                    options.numStates, options.seed, options.repeat, options.warmup)
+    if options.output is not None:
+        with open(options.output, 'w') as handle:
+            json.dump(results, handle, indent=2, sort_keys=True)
+    if options.compare is not None:
+        with open(options.compare) as handle:
+            compare(json.load(handle), results)
@@ -0,0 +1,518 @@
+# frameRenderer.py
+# ----------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+Draws games into in-memory frames without Tk, and writes them as PNG files
+or an animated GIF.
+
+Frames use graphicsDisplay's colors, sizes and screen layout.  Walls are
+drawn solid rather than as outlines.  Each frame is a buffer of palette
+indices; Frame.rgb() expands it to RGB.  PNG and GIF are written in pure
+Python (zlib and a small LZW encoder), so nothing beyond the standard
+library is needed; Pillow is used for GIFs when installed.
+
+  python pacman.py -p ExpectimaxAgent -q --frameTime 0 -r
+  python frameRenderer.py recorded-game-1... -o game.gif
+  python frameRenderer.py recorded-game-1... --png frames/
+"""
+
+import math
+import os
+import pickle
+import struct
+import sys
+import zlib
+
+from game import Directions
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+
+def rgb(r, g, b):
+    # Same rounding as graphicsUtils.formatColor
+    return (int(r * 255), int(g * 255), int(b * 255))
+
+
+# Palette indices
+BACKGROUND, WALL, WHITE, PACMAN, SCARED = 0, 1, 2, 3, 2
+PUPIL = 0
+GHOST_BASE = 4
+PALETTE = [
+    rgb(0, 0, 0),                                # background, pupils
+    rgb(0.0/255.0, 51.0/255.0, 255.0/255.0),     # walls
+    rgb(1, 1, 1),                                # food, capsules, eyes, scared ghosts
+    rgb(255.0/255.0, 255.0/255.0, 61.0/255),     # Pacman, score
+    rgb(.9, 0, 0),                               # ghosts
+    rgb(0, .3, .9),
+    rgb(.98, .41, .07),
+    rgb(.1, .75, .7),
+    rgb(1.0, 0.6, 0.0),
+    rgb(.4, 0.13, 0.91),
+]
+NUM_GHOST_COLORS = len(PALETTE) - GHOST_BASE
+
+# Sizes, as fractions of a grid cell, from graphicsDisplay
+FOOD_SIZE = 0.1
+CAPSULE_SIZE = 0.25
+PACMAN_SCALE = 0.5
+GHOST_SIZE = 0.65
+WALL_RADIUS = 0.15
+GHOST_SHAPE = [(0, 0.3), (0.25, 0.75), (0.5, 0.3), (0.75, 0.75), (0.75, -0.5), (0.5, -0.75),
+               (-0.5, -0.75), (-0.75, -0.5), (-0.75, 0.75), (-0.5, 0.3), (-0.25, 0.75)]
+
+# 3x5 bitmaps for the score line
+FONT = {
+    '0': ['###', '#.#', '#.#', '#.#', '###'], '1': ['.#.', '##.', '.#.', '.#.', '###'],
+    '2': ['###', '..#', '###', '#..', '###'], '3': ['###', '..#', '###', '..#', '###'],
+    '4': ['#.#', '#.#', '###', '..#', '..#'], '5': ['###', '#..', '###', '..#', '###'],
+    '6': ['###', '#..', '###', '#.#', '###'], '7': ['###', '..#', '..#', '..#', '..#'],
+    '8': ['###', '#.#', '###', '#.#', '###'], '9': ['###', '#.#', '###', '..#', '###'],
+    '-': ['...', '...', '###', '...', '...'], ' ': ['...', '...', '...', '...', '...'],
+    ':': ['...', '.#.', '...', '.#.', '...'], 'S': ['###', '#..', '###', '..#', '###'],
+    'C': ['###', '#..', '#..', '#..', '###'], 'O': ['###', '#.#', '#.#', '#.#', '###'],
+    'R': ['##.', '#.#', '##.', '#.#', '#.#'], 'E': ['###', '#..', '##.', '#..', '###'],
+}
+
+
+class Frame:
+    """
+    One picture: width x height palette indices, row by row from the top.
+    """
+
+    def __init__(self, width, height, pixels):
+        self.width = width
+        self.height = height
+        self.pixels = pixels
+
+    def rgb(self):
+        """
+        Returns the frame as a bytearray of RGB triples.
+        """
+        out = bytearray(len(self.pixels) * 3)
+        for channel in range(3):
+            table = bytes(PALETTE[i][channel] if i < len(PALETTE) else 0 for i in range(256))
+            out[channel::3] = self.pixels.translate(table)
+        return out
+
+
+def makeSprite(radius, colorAt):
+    """
+    Rasterizes colorAt(dx, dy) (palette index or None) over the square of
+    pixels within radius of the center, as runs (dy, dx, bytes) that can
+    be copied into a frame row by row.
+    """
+    size = int(math.ceil(radius))
+    runs = []
+    for dy in range(-size, size + 1):
+        row = [colorAt(dx, dy) for dx in range(-size, size + 1)] + [None]
+        start = None
+        for i, color in enumerate(row):
+            if color is not None and start is None:
+                start = i
+            elif color is None and start is not None:
+                runs.append((dy, start - size, bytes(row[start:i])))
+                start = None
+    return runs
+
+
+def circleSprite(radius, color):
+    return makeSprite(radius, lambda dx, dy: color if dx * dx + dy * dy <= radius * radius else None)
+
+
+def insidePolygon(x, y, points):
+    inside = False
+    for i in range(len(points)):
+        x1, y1 = points[i - 1]
+        x2, y2 = points[i]
+        if (y1 > y) != (y2 > y) and x < x1 + (y - y1) * (x2 - x1) / (y2 - y1):
+            inside = not inside
+    return inside
+
+
+class FrameRenderer:
+    """
+    Draws GameStateData of one layout into Frames.  The walls are drawn
+    once; sprites are made on first use and reused.
+    """
+
+    def __init__(self, layout, gridSize=10):
+        self.layout = layout
+        self.gridSize = gridSize
+        self.scale = max(1, int(gridSize) // 5)
+        self.width = int((layout.width + 1) * gridSize)
+        self.boardHeight = int((layout.height + 1) * gridSize)
+        self.height = self.boardHeight + 7 * self.scale
+        self.sprites = {}
+        self.background = self.drawWalls(layout.walls)
+
+    def toScreen(self, position):
+        # graphicsDisplay.PacmanGraphics.to_screen
+        x, y = position
+        return (int(round((x + 1) * self.gridSize)), int(round((self.layout.height - y) * self.gridSize)))
+
+    def fillRect(self, pixels, left, top, right, bottom, color):
+        left, right = max(0, left), min(self.width, right)
+        top, bottom = max(0, top), min(self.height, bottom)
+        if left >= right:
+            return
+        run = bytes([color]) * (right - left)
+        for y in range(top, bottom):
+            pixels[y * self.width + left:y * self.width + right] = run
+
+    def drawWalls(self, walls):
+        """
+        Draws every wall cell as a square joined by bars to its neighboring
+        wall cells, the solid version of drawWalls' outlines.
+        """
+        pixels = bytearray(self.width * self.height)
+        half = max(1, int(round(WALL_RADIUS * self.gridSize)))
+        for x in range(walls.width):
+            for y in range(walls.height):
+                if not walls[x][y]:
+                    continue
+                cx, cy = self.toScreen((x, y))
+                self.fillRect(pixels, cx - half, cy - half, cx + half + 1, cy + half + 1, WALL)
+                if x + 1 < walls.width and walls[x + 1][y]:
+                    ex, ey = self.toScreen((x + 1, y))
+                    self.fillRect(pixels, cx, cy - half, ex + 1, cy + half + 1, WALL)
+                if y + 1 < walls.height and walls[x][y + 1]:
+                    nx, ny = self.toScreen((x, y + 1))
+                    self.fillRect(pixels, cx - half, ny, cx + half + 1, cy + 1, WALL)
+        return pixels
+
+    def blit(self, pixels, runs, position):
+        cx, cy = position
+        width, height = self.width, self.boardHeight
+        for dy, dx, colors in runs:
+            y = cy + dy
+            if y < 0 or y >= height:
+                continue
+            left = cx + dx
+            right = left + len(colors)
+            if left < 0 or right > width:
+                colors = colors[max(0, -left):len(colors) - max(0, right - width)]
+                left = max(0, left)
+                right = left + len(colors)
+            pixels[y * width + left:y * width + right] = colors
+
+    def sprite(self, key):
+        if key not in self.sprites:
+            self.sprites[key] = self.makeSpriteFor(*key)
+        return self.sprites[key]
+
+    def makeSpriteFor(self, kind, *args):
+        g = self.gridSize
+        if kind == 'food':
+            return circleSprite(FOOD_SIZE * g, WHITE)
+        if kind == 'capsule':
+            return circleSprite(CAPSULE_SIZE * g, WHITE)
+        if kind == 'pacman':
+            direction, mouth = args
+            radius = PACMAN_SCALE * g
+            facing = {Directions.NORTH: 90, Directions.WEST: 180, Directions.SOUTH: 270}.get(direction, 0)
+
+            def colorAt(dx, dy):
+                if dx * dx + dy * dy > radius * radius:
+                    return None
+                angle = math.degrees(math.atan2(-dy, dx))
+                if (dx or dy) and abs((angle - facing + 180) % 360 - 180) < mouth / 2.0:
+                    return None
+                return PACMAN
+            return makeSprite(radius, colorAt)
+        # A ghost: the body polygon, then eyes looking the way it moves
+        color, direction = args
+        size = g * GHOST_SIZE
+        shape = [(x * size, y * size) for x, y in GHOST_SHAPE]
+        lookX, lookY = {Directions.NORTH: (0, -0.2), Directions.SOUTH: (0, 0.2),
+                        Directions.EAST: (0.2, 0), Directions.WEST: (-0.2, 0)}.get(direction, (0, 0))
+        eyes = [(size * (side + lookX / 1.5), -size * (0.3 - lookY / 1.5)) for side in (-0.3, 0.3)]
+        pupils = [(size * (side + lookX), -size * (0.3 - lookY)) for side in (-0.3, 0.3)]
+
+        def colorAt(dx, dy):
+            for px, py in pupils:
+                if (dx - px) ** 2 + (dy - py) ** 2 <= (size * 0.08) ** 2:
+                    return PUPIL
+            for ex, ey in eyes:
+                if (dx - ex) ** 2 + (dy - ey) ** 2 <= (size * 0.2) ** 2:
+                    return WHITE
+            return color if insidePolygon(dx, dy, shape) else None
+        return makeSprite(0.75 * size + 1, colorAt)
+
+    def drawText(self, pixels, text, left, top, color):
+        s = self.scale
+        for char in text:
+            for row, bits in enumerate(FONT.get(char, FONT[' '])):
+                for column, bit in enumerate(bits):
+                    if bit == '#':
+                        x, y = left + column * s, top + row * s
+                        self.fillRect(pixels, x, y, x + s, y + s, color)
+            left += 4 * s
+
+    def render(self, state):
+        """
+        Returns a Frame of the GameStateData state.
+        """
+        pixels = bytearray(self.background)
+        food = self.sprite(('food',))
+        for cell in state.food.asList():
+            self.blit(pixels, food, self.toScreen(cell))
+        capsule = self.sprite(('capsule',))
+        for cell in state.capsules:
+            self.blit(pixels, capsule, self.toScreen(cell))
+        for index, agentState in enumerate(state.agentStates):
+            if agentState.configuration == None:
+                continue
+            x, y = agentState.configuration.pos
+            direction = agentState.configuration.direction
+            if agentState.isPacman:
+                # graphicsDisplay.getEndpoints: the mouth opens between cells
+                mouth = int(30 + 80 * math.sin(math.pi * (x - int(x) + y - int(y))))
+                key = ('pacman', direction, mouth)
+            elif agentState.scaredTimer > 0:
+                key = ('ghost', SCARED, direction)
+            else:
+                key = ('ghost', GHOST_BASE + (index - 1) % NUM_GHOST_COLORS, direction)
+            self.blit(pixels, self.sprite(key), self.toScreen((x, y)))
+        self.drawText(pixels, 'SCORE: %d' % state.score, self.gridSize, self.boardHeight + self.scale, PACMAN)
+        return Frame(self.width, self.height, pixels)
+
+
+def writePNG(path, frame):
+    """
+    Writes a Frame as an 8-bit RGB PNG.
+    """
+    rgbData = frame.rgb()
+    stride = frame.width * 3
+    raw = b''.join(b'\x00' + rgbData[y * stride:(y + 1) * stride] for y in range(frame.height))
+
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+    with open(path, 'wb') as handle:
+        handle.write(b'\x89PNG\r\n\x1a\n')
+        handle.write(chunk(b'IHDR', struct.pack('>IIBBBBB', frame.width, frame.height, 8, 2, 0, 0, 0)))
+        handle.write(chunk(b'IDAT', zlib.compress(bytes(raw), 6)))
+        handle.write(chunk(b'IEND', b''))
+
+
+def lzwEncode(pixels, minCodeSize):
+    """
+    Returns the GIF LZW code stream for a sequence of palette indices.
+    """
+    clear = 1 << minCodeSize
+    end = clear + 1
+    codeSize = minCodeSize + 1
+    nextCode = end + 1
+    table = {}
+    out = bytearray()
+    buffer, bits = clear, codeSize
+    prefix = pixels[0]
+    for index in range(1, len(pixels)):
+        pixel = pixels[index]
+        key = (prefix << 8) | pixel
+        code = table.get(key)
+        if code is not None:
+            prefix = code
+            continue
+        buffer |= prefix << bits
+        bits += codeSize
+        while bits >= 8:
+            out.append(buffer & 0xff)
+            buffer >>= 8
+            bits -= 8
+        # The decoder widens its codes one code after the table fills
+        if nextCode >= (1 << codeSize) and codeSize < 12:
+            codeSize += 1
+        if nextCode < 4096:
+            table[key] = nextCode
+            nextCode += 1
+        else:
+            buffer |= clear << bits
+            bits += codeSize
+            table = {}
+            codeSize = minCodeSize + 1
+            nextCode = end + 1
+        prefix = pixel
+    buffer |= prefix << bits
+    bits += codeSize
+    if nextCode >= (1 << codeSize) and codeSize < 12:
+        codeSize += 1
+    buffer |= end << bits
+    bits += codeSize
+    while bits > 0:
+        out.append(buffer & 0xff)
+        buffer >>= 8
+        bits -= 8
+    return out
+
+
+def changedBox(previous, frame):
+    """
+    Returns (left, top, right, bottom) bounding the pixels that differ
+    between two frames of the same size, or None if they are equal.
+    """
+    width = frame.width
+    rows = [y for y in range(frame.height)
+            if previous.pixels[y * width:(y + 1) * width] != frame.pixels[y * width:(y + 1) * width]]
+    if len(rows) == 0:
+        return None
+    left, right = width, 0
+    for y in rows:
+        a = previous.pixels[y * width:(y + 1) * width]
+        b = frame.pixels[y * width:(y + 1) * width]
+        # Binary search the longest equal prefix and suffix
+        low, high = 0, width
+        while low < high:
+            middle = (low + high + 1) // 2
+            if a[:middle] == b[:middle]:
+                low = middle
+            else:
+                high = middle - 1
+        left = min(left, low)
+        low, high = 0, width
+        while low < high:
+            middle = (low + high + 1) // 2
+            if a[width - middle:] == b[width - middle:]:
+                low = middle
+            else:
+                high = middle - 1
+        right = max(right, width - low)
+    return (left, rows[0], right, rows[-1] + 1)
+
+
+def writeGIF(path, frames, delay=10):
+    """
+    Writes Frames (all the same size) as a looping GIF with delay
+    hundredths of a second per frame.  Each frame after the first only
+    stores the rectangle that changed.
+    """
+    paletteBytes = b''.join(bytes(color) for color in PALETTE)
+    if Image is not None:
+        images = []
+        for frame in frames:
+            image = Image.frombytes('P', (frame.width, frame.height), bytes(frame.pixels))
+            image.putpalette(paletteBytes)
+            images.append(image)
+        images[0].save(path, save_all=True, append_images=images[1:], duration=delay * 10, loop=0)
+        return
+    tableBits = max(2, (len(PALETTE) - 1).bit_length())
+    paletteBytes += b'\x00' * (3 * (1 << tableBits) - len(paletteBytes))
+    width, height = frames[0].width, frames[0].height
+    with open(path, 'wb') as handle:
+        handle.write(b'GIF89a' + struct.pack('<HHBBB', width, height, 0xf0 | (tableBits - 1), 0, 0))
+        handle.write(paletteBytes)
+        handle.write(b'\x21\xff\x0bNETSCAPE2.0\x03\x01\x00\x00\x00')
+        previous = None
+        pending = 0
+        for frame in frames:
+            box = (0, 0, width, height) if previous is None else changedBox(previous, frame)
+            if box is None:
+                # Nothing changed: lengthen the last frame instead
+                pending += delay
+                continue
+            if previous is not None:
+                writeGIFImage(handle, previous, lastBox, delay + pending, tableBits)
+            previous, lastBox, pending = frame, box, 0
+        writeGIFImage(handle, previous, lastBox, delay + pending, tableBits)
+        handle.write(b'\x3b')
+
+
+def writeGIFImage(handle, frame, box, delay, tableBits):
+    left, top, right, bottom = box
+    pixels = b''.join(frame.pixels[y * frame.width + left:y * frame.width + right] for y in range(top, bottom))
+    # Graphic control extension: keep the previous frame under this one
+    handle.write(b'\x21\xf9\x04\x04' + struct.pack('<H', min(delay, 0xffff)) + b'\x00\x00')
+    handle.write(b'\x2c' + struct.pack('<HHHHB', left, top, right - left, bottom - top, 0))
+    handle.write(bytes([tableBits]))
+    data = lzwEncode(pixels, tableBits)
+    for start in range(0, len(data), 255):
+        block = data[start:start + 255]
+        handle.write(bytes([len(block)]) + block)
+    handle.write(b'\x00')
+
+
+class FrameDisplay:
+    """
+    A display that keeps a Frame of every every-th move; finish() writes
+    them to gifPath and/or numbered PNGs in pngDir.
+    """
+
+    def __init__(self, gridSize=10, every=1, gifPath=None, pngDir=None, delay=10):
+        self.gridSize = gridSize
+        self.every = every
+        self.gifPath = gifPath
+        self.pngDir = pngDir
+        self.delay = delay
+        self.frames = []
+
+    def initialize(self, state, isBlue=False):
+        self.renderer = FrameRenderer(state.layout, self.gridSize)
+        self.moves = 0
+        self.frames = [self.renderer.render(state)]
+
+    def update(self, state):
+        self.moves += 1
+        if self.moves % self.every == 0 or state._win or state._lose:
+            self.frames.append(self.renderer.render(state))
+
+    def finish(self):
+        if self.gifPath is not None:
+            writeGIF(self.gifPath, self.frames, self.delay)
+        if self.pngDir is not None:
+            if not os.path.isdir(self.pngDir):
+                os.makedirs(self.pngDir)
+            for index, frame in enumerate(self.frames):
+                writePNG(os.path.join(self.pngDir, 'frame-%05d.png' % index), frame)
+
+    def checkNullDisplay(self):
+        return False
+
+
+def readCommand(argv):
+    from optparse import OptionParser
+    from pacman import default
+    usageStr = """
+    USAGE:      python frameRenderer.py <recorded game> <options>
+    EXAMPLES:   (1) python frameRenderer.py recorded-game-1... -o game.gif
+                (2) python frameRenderer.py recorded-game-1... --png frames --gridSize 30
+    """
+    parser = OptionParser(usageStr)
+    parser.add_option('-o', '--output', dest='output', default=None,
+                      help='Write an animated GIF to this file')
+    parser.add_option('--png', dest='pngDir', default=None,
+                      help='Write numbered PNG frames to this directory')
+    parser.add_option('-g', '--gridSize', dest='gridSize', type='int',
+                      help=default('pixels per grid cell'), default=10)
+    parser.add_option('--every', dest='every', type='int',
+                      help=default('keep one frame every this many moves'), default=1)
+    parser.add_option('--delay', dest='delay', type='int',
+                      help=default('GIF frame delay in hundredths of a second'), default=10)
+    options, otherjunk = parser.parse_args(argv)
+    if len(otherjunk) != 1:
+        raise Exception('Give one recorded game file, not: ' + str(otherjunk))
+    if options.output is None and options.pngDir is None:
+        options.output = otherjunk[0] + '.gif'
+    return options, otherjunk[0]
+
+
+if __name__ == '__main__':
+    import pacman
+    options, recordedPath = readCommand(sys.argv[1:])
+    with open(recordedPath, 'rb') as handle:
+        recorded = pickle.load(handle)
+    recorded['display'] = FrameDisplay(options.gridSize, options.every, options.output,
+                                       options.pngDir, options.delay)
+    pacman.replayGame(**recorded)
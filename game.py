@@ -21,10 +21,13 @@
 # For more info, see http://inst.eecs.berkeley.edu/~cs188/sp09/pacman.html
 
 from util import *
+import array
+import random
 import time
 import os
 import traceback
 import sys
+import zlib
 
 #######################
 # Parts worth reading #
@@ -37,7 +40,12 @@ class Agent:
     following methods which will be called if they exist:
 
     def registerInitialState(self, state): # inspects the starting state
+
+    Agents that make random choices should draw them from self.rng, which
+    the Game sets to its own random.Random before the game starts.  Outside
+    a game it is the global random module.
     """
+    rng = random
 
     def __init__(self, index=0):
         self.index = index
@@ -171,75 +179,105 @@ class AgentState:
 
 class Grid:
     """
-    A 2-dimensional array of objects backed by a list of lists.  Data is accessed
-    via grid[x][y] where (x,y) are positions on a Pacman map with x horizontal,
-    y vertical and the origin (0,0) in the bottom left corner.
+    A 2-dimensional array of booleans backed by one flat bytearray.  Data is
+    accessed via grid[x][y] where (x,y) are positions on a Pacman map with x
+    horizontal, y vertical and the origin (0,0) in the bottom left corner.
+
+    Cells are stored column by column (index x * height + y) and grid[x] is a
+    boolean memoryview of column x, so reads and writes through it go
+    straight to the shared buffer.  As with lists of booleans, cells read
+    back as True or False, and a written value is stored as its truth value.
+    Bulk operations (count, asList, equality, hashing, copying) run over the
+    whole buffer at once.
 
     The __str__ method constructs an output that is oriented like a pacman board.
     """
+    CELLS_PER_INT = 30
 
     def __init__(self, width, height, initialValue=False, bitRepresentation=None):
         if initialValue not in [False, True]:
             raise Exception('Grids can only contain booleans')
-        self.CELLS_PER_INT = 30
+        data = bytearray(width * height)
+        if initialValue:
+            data = bytearray(b'\x01') * (width * height)
+        self._wrap(width, height, data)
+        if bitRepresentation:
+            self._unpackBits(bitRepresentation)
 
+    def _wrap(self, width, height, data, columns=None):
         self.width = width
         self.height = height
-        self.data = [[initialValue for y in range(
-            height)] for x in range(width)]
-        if bitRepresentation:
-            self._unpackBits(bitRepresentation)
+        self.data = data
+        # Format '?' reads cells as bools and stores writes as 0 or 1
+        self._view = memoryview(data).cast('?')
+        # Column views are made on first access
+        self._columns = columns if columns is not None else [None] * width
 
     def __getitem__(self, i):
-        return self.data[i]
+        column = self._columns[i]
+        if column is None:
+            if i < 0:
+                i += self.width
+            start = i * self.height
+            column = self._columns[i] = self._view[start:start + self.height]
+        return column
 
     def __setitem__(self, key, item):
-        self.data[key] = item
+        if len(item) != self.height:
+            raise ValueError('Grid columns must have %d cells' % self.height)
+        start = key * self.height
+        self.data[start:start + self.height] = bytes(1 if v else 0 for v in item)
+
+    def __getstate__(self):
+        # memoryviews cannot be pickled
+        return (self.width, self.height, bytes(self.data))
+
+    def __setstate__(self, state):
+        width, height, data = state
+        self._wrap(width, height, bytearray(data))
 
     def __str__(self):
-        out = [[str(self.data[x][y])[0] for x in range(self.width)]
-               for y in range(self.height)]
-        out.reverse()
-        return '\n'.join([''.join(x) for x in out])
+        rows = [self.data[y::self.height].translate(_GRID_STR_TABLE).decode()
+                for y in range(self.height - 1, -1, -1)]
+        return '\n'.join(rows)
 
     def __eq__(self, other):
         if other == None:
             return False
-        return self.data == other.data
+        return self.height == other.height and self.data == other.data
 
     def __hash__(self):
-        # return hash(str(self))
-        base = 1
-        h = 0
-        for l in self.data:
-            for i in l:
-                if i:
-                    h += base
-                base *= 2
-        return hash(h)
+        # Reads the buffer in place, where hash(bytes(...)) would copy it
+        return zlib.crc32(self.data)
 
     def copy(self):
-        g = Grid(self.width, self.height)
-        g.data = [x[:] for x in self.data]
+        g = Grid.__new__(Grid)
+        g._wrap(self.width, self.height, bytearray(self.data))
         return g
 
     def deepCopy(self):
         return self.copy()
 
     def shallowCopy(self):
-        g = Grid(self.width, self.height)
-        g.data = self.data
+        g = Grid.__new__(Grid)
+        g._wrap(self.width, self.height, self.data, self._columns)
         return g
 
     def count(self, item=True):
-        return sum([x.count(item) for x in self.data])
+        if item not in [False, True]:
+            return 0
+        return self.data.count(1 if item else 0)
 
     def asList(self, key=True):
+        if key not in [False, True]:
+            return []
+        target = 1 if key else 0
+        data, height = self.data, self.height
         list = []
-        for x in range(self.width):
-            for y in range(self.height):
-                if self[x][y] == key:
-                    list.append((x, y))
+        index = data.find(target)
+        while index != -1:
+            list.append((index // height, index % height))
+            index = data.find(target, index + 1)
         return list
 
     def packBits(self):
@@ -247,22 +285,21 @@ class Grid:
         Returns an efficient int list representation
 
         (width, height, bitPackedInts...)
+
+        Cells are packed CELLS_PER_INT to an int, first cell in the highest bit.
         """
         bits = [self.width, self.height]
-        currentInt = 0
-        for i in range(self.height * self.width):
-            bit = self.CELLS_PER_INT - (i % self.CELLS_PER_INT) - 1
-            x, y = self._cellIndexToPosition(i)
-            if self[x][y]:
-                currentInt += 2 ** bit
-            if (i + 1) % self.CELLS_PER_INT == 0:
-                bits.append(currentInt)
-                currentInt = 0
-        bits.append(currentInt)
+        size = self.CELLS_PER_INT
+        digits = self.data.translate(_GRID_BIT_TABLE)
+        full = len(digits) - len(digits) % size
+        for start in range(0, full, size):
+            bits.append(int(digits[start:start + size], 2))
+        rest = digits[full:]
+        bits.append(int(rest.ljust(size, b'0'), 2) if len(rest) > 0 else 0)
         return tuple(bits)
 
     def _cellIndexToPosition(self, index):
-        x = index / self.height
+        x = index // self.height
         y = index % self.height
         return x, y
 
@@ -270,27 +307,18 @@ class Grid:
         """
         Fills in data from a bit-level representation
         """
-        cell = 0
+        digits = bytearray()
         for packed in bits:
-            for bit in self._unpackInt(packed, self.CELLS_PER_INT):
-                if cell == self.width * self.height:
-                    break
-                x, y = self._cellIndexToPosition(cell)
-                self[x][y] = bit
-                cell += 1
-
-    def _unpackInt(self, packed, size):
-        bools = []
-        if packed < 0:
-            raise ValueError("must be a positive integer")
-        for i in range(size):
-            n = 2 ** (self.CELLS_PER_INT - i - 1)
-            if packed >= n:
-                bools.append(True)
-                packed -= n
-            else:
-                bools.append(False)
-        return bools
+            if packed < 0:
+                raise ValueError("must be a positive integer")
+            digits += format(packed, '0%db' % self.CELLS_PER_INT).encode()
+        cells = digits[:self.width * self.height].translate(_GRID_UNBIT_TABLE)
+        self.data[:len(cells)] = cells
+
+
+_GRID_STR_TABLE = bytes.maketrans(b'\x00\x01', b'FT')
+_GRID_BIT_TABLE = bytes.maketrans(b'\x00\x01', b'01')
+_GRID_UNBIT_TABLE = bytes.maketrans(b'01', b'\x00\x01')
 
 
 def reconstituteGrid(bitRep):
@@ -393,6 +421,145 @@ class Actions:
     getSuccessor = staticmethod(getSuccessor)
 
 
+class ActionDistribution:
+    """
+    A weight (usually a probability) for each of the five Directions, kept
+    in a fixed-size list instead of a dict.  It reads like a util.Counter:
+    missing actions weigh 0, keys() and items() give the actions with a
+    nonzero weight in sorted order, + and - work per action and * is the dot
+    product, with either another ActionDistribution or a Counter.
+
+    sample() draws from the generator exactly like util.sample on the same
+    Counter: one random() call, with actions taken in sorted order.
+    """
+    ACTIONS = sorted([Directions.NORTH, Directions.SOUTH, Directions.EAST,
+                      Directions.WEST, Directions.STOP])
+    INDEX = dict((action, i) for i, action in enumerate(ACTIONS))
+
+    __slots__ = ['weights']
+
+    def __init__(self, weights=None):
+        self.weights = [0.0] * len(self.ACTIONS) if weights is None else list(weights)
+
+    def fromCounter(counter):
+        dist = ActionDistribution()
+        for action, weight in counter.items():
+            dist.weights[ActionDistribution.INDEX[action]] = weight
+        return dist
+    fromCounter = staticmethod(fromCounter)
+
+    def asCounter(self):
+        counter = Counter()
+        for action, weight in self.items():
+            counter[action] = weight
+        return counter
+
+    def __getitem__(self, action):
+        return self.weights[self.INDEX[action]]
+
+    def __setitem__(self, action, weight):
+        self.weights[self.INDEX[action]] = weight
+
+    def __contains__(self, action):
+        return action in self.INDEX and self.weights[self.INDEX[action]] != 0
+
+    def __len__(self):
+        return len(self.weights) - self.weights.count(0)
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __eq__(self, other):
+        return isinstance(other, ActionDistribution) and self.weights == other.weights
+
+    __hash__ = None
+
+    def __repr__(self):
+        return 'ActionDistribution(%s)' % dict(self.items())
+
+    def keys(self):
+        return [action for action, weight in zip(self.ACTIONS, self.weights) if weight != 0]
+
+    def values(self):
+        return [weight for weight in self.weights if weight != 0]
+
+    def items(self):
+        return [(action, weight) for action, weight in zip(self.ACTIONS, self.weights) if weight != 0]
+
+    def copy(self):
+        return ActionDistribution(self.weights)
+
+    def totalCount(self):
+        return sum(self.weights)
+
+    def normalize(self):
+        """
+        Scales the weights to sum to 1; does nothing if they sum to 0.
+        """
+        total = float(sum(self.weights))
+        if total == 0:
+            return
+        self.weights = [weight / total for weight in self.weights]
+
+    def divideAll(self, divisor):
+        divisor = float(divisor)
+        self.weights = [weight / divisor for weight in self.weights]
+
+    def incrementAll(self, keys, count):
+        for key in keys:
+            self.weights[self.INDEX[key]] += count
+
+    def argMax(self):
+        """
+        Returns the action with the highest nonzero weight, the first in
+        sorted order on ties, or None.
+        """
+        items = self.items()
+        if len(items) == 0:
+            return None
+        return max(items, key=lambda item: item[1])[0]
+
+    def sortedKeys(self):
+        return [action for action, weight in sorted(self.items(), key=lambda item: -item[1])]
+
+    def __add__(self, y):
+        return ActionDistribution([weight + y[action] for action, weight in zip(self.ACTIONS, self.weights)])
+
+    def __sub__(self, y):
+        return ActionDistribution([weight - y[action] for action, weight in zip(self.ACTIONS, self.weights)])
+
+    def __mul__(self, y):
+        """
+        A number scales the weights; a distribution or Counter gives the dot
+        product.
+        """
+        if isinstance(y, (int, float)):
+            return ActionDistribution([weight * y for weight in self.weights])
+        return sum(weight * y[action] for action, weight in zip(self.ACTIONS, self.weights) if weight != 0)
+
+    __rmul__ = __mul__
+
+    def sample(self, rng=random):
+        """
+        Returns an action drawn with probability proportional to its weight.
+        """
+        weights = self.weights
+        total = sum(weights)
+        if total != 1:
+            total = float(total)
+            weights = [weight / total for weight in weights]
+        choice = rng.random()
+        cumulative, chosen = None, None
+        for action, weight in zip(self.ACTIONS, weights):
+            if weight == 0:
+                continue
+            cumulative = weight if cumulative is None else cumulative + weight
+            chosen = action
+            if choice <= cumulative:
+                break
+        return chosen
+
+
 class GameStateData:
 
     def __init__(self, prevState=None):
@@ -462,13 +629,11 @@ class GameStateData:
 
     def __str__(self):
         width, height = self.layout.width, self.layout.height
-        map = Grid(width, height)
         if type(self.food) == type((1, 2)):
             self.food = reconstituteGrid(self.food)
-        for x in range(width):
-            for y in range(height):
-                food, walls = self.food, self.layout.walls
-                map[x][y] = self._foodWallStr(food[x][y], walls[x][y])
+        food, walls = self.food, self.layout.walls
+        map = [[self._foodWallStr(food[x][y], walls[x][y]) for y in range(height)]
+               for x in range(width)]
 
         for agentState in self.agentStates:
             if agentState == None:
@@ -485,7 +650,8 @@ class GameStateData:
         for x, y in self.capsules:
             map[x][y] = 'o'
 
-        return str(map) + ("\nScore: %d\n" % self.score)
+        rows = [''.join(map[x][y] for x in range(width)) for y in range(height - 1, -1, -1)]
+        return '\n'.join(rows) + ("\nScore: %d\n" % self.score)
 
     def _foodWallStr(self, hasFood, hasWall):
         if hasFood:
@@ -538,6 +704,23 @@ class GameStateData:
         self._eaten = [False for a in self.agentStates]
 
 
+def latencyPercentiles(latencies):
+    """
+    Summarizes a sequence of move latencies (in seconds) as a dict with the
+    number of moves, mean, p50, p90, p99 and max.  Percentiles use the
+    nearest-rank method.  Returns None for an empty sequence.
+    """
+    n = len(latencies)
+    if n == 0:
+        return None
+    ordered = sorted(latencies)
+
+    def rank(p):
+        return ordered[max(0, -(-p * n // 100) - 1)]
+    return {'moves': n, 'mean': sum(ordered) / n, 'p50': rank(50),
+            'p90': rank(90), 'p99': rank(99), 'max': ordered[-1]}
+
+
 try:
     import boinc
     _BOINC_ENABLED = True
@@ -550,7 +733,8 @@ class Game:
     The Game manages the control flow, soliciting actions from agents.
     """
 
-    def __init__(self, agents, display, rules, startingIndex=0, muteAgents=False, catchExceptions=False):
+    def __init__(self, agents, display, rules, startingIndex=0, muteAgents=False, catchExceptions=False, cpuTime=False,
+                 rng=None):
         self.agentCrashed = False
         self.agents = agents
         self.display = display
@@ -562,10 +746,22 @@ class Game:
         self.moveHistory = []
         self.totalAgentTimes = [0 for agent in agents]
         self.totalAgentTimeWarnings = [0 for agent in agents]
+        # Every getAction latency per agent, in seconds of wall or CPU time
+        self.cpuTime = cpuTime
+        self.agentLatencies = [array.array('d') for agent in agents]
         self.agentTimeout = False
+        # The source of every random choice in this game, shared with the
+        # agents; without one the game uses the global random module
+        self.rng = rng if rng is not None else random
         import io
         self.agentOutput = [io.StringIO() for agent in agents]
 
+    def getLatencyStats(self):
+        """
+        Returns latencyPercentiles for each agent (None if it never moved).
+        """
+        return [latencyPercentiles(l) for l in self.agentLatencies]
+
     def getProgress(self):
         if self.gameOver:
             return 1.0
@@ -620,6 +816,7 @@ class Game:
                 self.unmute()
                 self._agentCrash(i, quiet=True)
                 return
+            agent.rng = self.rng
             if ("registerInitialState" in dir(agent)):
                 self.mute(i)
                 if self.catchExceptions:
@@ -649,6 +846,10 @@ class Game:
 
         agentIndex = self.startingIndex
         numAgents = len(self.agents)
+        if self.cpuTime:
+            clock = time.process_time
+        else:
+            clock = time.perf_counter
 
         while not self.gameOver:
             # Fetch the next agent
@@ -683,6 +884,7 @@ class Game:
             # Solicit an action
             action = None
             self.mute(agentIndex)
+            moveStart = clock()
             if self.catchExceptions:
                 try:
                     timed_func = TimeoutFunction(agent.getAction, int(
@@ -691,7 +893,11 @@ class Game:
                         start_time = time.time()
                         if skip_action:
                             raise TimeoutFunctionException()
-                        action = timed_func(observation)
+                        try:
+                            action = timed_func(observation)
+                        finally:
+                            # Also recorded for moves that time out or raise
+                            self.agentLatencies[agentIndex].append(clock() - moveStart)
                     except TimeoutFunctionException:
                         print("Agent %d timed out on a single move!" %
                               agentIndex, file=sys.stderr)
@@ -730,6 +936,7 @@ class Game:
                     return
             else:
                 action = agent.getAction(observation)
+                self.agentLatencies[agentIndex].append(clock() - moveStart)
             self.unmute()
 
             # Execute the action
@@ -15,6 +15,7 @@
 from game import Agent
 from game import Actions
 from game import Directions
+from game import ActionDistribution
 import random
 from util import manhattanDistance
 import util
@@ -29,10 +30,10 @@ class GhostAgent(Agent):
         if len(dist) == 0:
             return Directions.STOP
         else:
-            return util.chooseFromDistribution(dist)
+            return util.chooseFromDistribution(dist, self.rng)
 
     def getDistribution(self, state):
-        "Returns a Counter encoding a distribution over actions from the provided state."
+        "Returns an ActionDistribution (or Counter) over actions from the provided state."
         util.raiseNotDefined()
 
 
@@ -40,7 +41,7 @@ class RandomGhost(GhostAgent):
     "A ghost that chooses a legal action uniformly at random."
 
     def getDistribution(self, state):
-        dist = util.Counter()
+        dist = ActionDistribution()
         for a in state.getLegalActions(self.index):
             dist[a] = 1.0
         dist.normalize()
@@ -84,7 +85,7 @@ class DirectionalGhost(GhostAgent):
             legalActions, distancesToPacman) if distance == bestScore]
 
         # Construct distribution
-        dist = util.Counter()
+        dist = ActionDistribution()
         for a in bestActions:
             dist[a] = bestProb / len(bestActions)
         for a in legalActions:
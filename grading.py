@@ -14,12 +14,8 @@
 
 "Common code for autograders"
 
-import html
 import time
 import sys
-import json
-import traceback
-import pdb
 from collections import defaultdict
 import util
 
@@ -81,6 +77,7 @@ class Grades:
                     self)  # Call the question's function
                 # TimeoutFunction(getattr(gradingModule, q),1200)(self) # Call the question's function
             except Exception as inst:
+                import traceback
                 self.addExceptionMessage(q, inst, traceback)
                 self.addErrorHints(exceptionMap, inst, q[1])
             except:
@@ -153,7 +150,9 @@ to follow your instructor's guidelines to receive credit on your project.
         """
         self.fail('FAIL: Exception raised: %s' % inst)
         self.addMessage('')
-        for line in traceback.format_exc().split('\n'):
+        # Exceptions replayed from a worker process carry their own traceback
+        trace = getattr(inst, 'remoteTraceback', None) or traceback.format_exc()
+        for line in trace.split('\n'):
             self.addMessage(line)
 
     def addErrorHints(self, exceptionMap, errorInstance, questionNum):
@@ -211,6 +210,7 @@ to follow your instructor's guidelines to receive credit on your project.
         out_dct['tests'] = tests_out
 
         # file output
+        import json
         with open('gradescope_response.json', 'w') as outfile:
             json.dump(out_dct, outfile)
         return
@@ -299,6 +299,7 @@ to follow your instructor's guidelines to receive credit on your project.
             print('*** ' + message)
             if self.mute:
                 util.mutePrint()
+            import html
             message = html.escape(message)
         self.messages[self.currentQuestion].append(message)
 
@@ -310,6 +311,76 @@ to follow your instructor's guidelines to receive credit on your project.
             # self.messages[self.currentQuestion].append(line)
 
 
+class RecordingGrades:
+    """
+    Stands in for Grades while a test case runs in a worker process.  Every
+    Grades method call and everything printed to stdout is recorded in order
+    so that replayRecorded can apply it to the real Grades afterwards.
+    """
+
+    def __init__(self):
+        self.events = []
+
+    def write(self, text):
+        self.events.append(('print', text))
+
+    def flush(self):
+        pass
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+
+        def record(*args, **kwargs):
+            self.events.append(('call', name, args, kwargs))
+        return record
+
+
+def runRecorded(thunk):
+    """
+    Runs a test case thunk against a RecordingGrades with stdout captured.
+    Returns (result, events, error) where error is None or a picklable
+    (exception, traceback text) pair.
+    """
+    import pickle
+    recorder = RecordingGrades()
+    oldStdout = sys.stdout
+    sys.stdout = recorder
+    result, error = None, None
+    try:
+        result = thunk(recorder)
+    except Exception as inst:
+        import traceback
+        trace = traceback.format_exc()
+        try:
+            pickle.dumps(inst)
+        except Exception:
+            inst = Exception(str(inst))
+        error = (inst, trace)
+    finally:
+        sys.stdout = oldStdout
+    return result, recorder.events, error
+
+
+def replayRecorded(grades, recorded):
+    """
+    Applies the output of runRecorded to grades and returns the thunk's
+    result, re-raising its exception if it had one.
+    """
+    result, events, error = recorded
+    for event in events:
+        if event[0] == 'print':
+            sys.stdout.write(event[1])
+        else:
+            name, args, kwargs = event[1:]
+            getattr(grades, name)(*args, **kwargs)
+    if error is not None:
+        inst, trace = error
+        inst.remoteTraceback = trace
+        raise inst
+    return result
+
+
 class Counter(dict):
     """
     Dict with default 0
@@ -161,7 +161,18 @@ class InfoPane:
 
 
 class PacmanGraphics:
-    def __init__(self, zoom=1.0, frameTime=0.0, capture=False):
+    """
+    Draws the game in a Tk window.
+
+    By default every move is drawn as it happens and Pacman's moves are
+    animated over frameTime seconds, dropping animation frames when drawing
+    falls behind.  With batched=True the moves of a round are collected and
+    drawn in one redraw, without animation, once every agent has moved;
+    frameTime is then the pause after each round, and when rounds arrive
+    faster than targetFps the redraw is skipped and merged into the next.
+    """
+
+    def __init__(self, zoom=1.0, frameTime=0.0, capture=False, batched=False, targetFps=30.0):
         self.have_window = 0
         self.currentGhostImages = {}
         self.pacmanImage = None
@@ -169,6 +180,9 @@ class PacmanGraphics:
         self.gridSize = DEFAULT_GRID_SIZE * zoom
         self.capture = capture
         self.frameTime = frameTime
+        self.batched = batched
+        self.targetFps = targetFps
+        self.framesDropped = 0
 
     def checkNullDisplay(self):
         return False
@@ -193,6 +207,17 @@ class PacmanGraphics:
         self.make_window(self.width, self.height)
         self.infoPane = InfoPane(layout, self.gridSize)
         self.currentState = layout
+        # Batched rendering state, reset for every new window
+        self.shownScore = None
+        self.shownGhostDistances = None
+        self.lastFrameTime = 0.0
+        self.clearPending()
+
+    def clearPending(self):
+        self.pendingState = None
+        self.pendingAgents = set()
+        self.pendingFood = []
+        self.pendingCapsules = []
 
     def drawDistributions(self, state):
         walls = state.layout.walls
@@ -243,6 +268,9 @@ class PacmanGraphics:
         refresh()
 
     def update(self, newState):
+        if self.batched and self.frameTime >= 0:
+            self.queueUpdate(newState)
+            return
         agentIndex = newState._agentMoved
         agentState = newState.agentStates[agentIndex]
 
@@ -259,9 +287,83 @@ class PacmanGraphics:
             self.removeFood(newState._foodEaten, self.food)
         if newState._capsuleEaten != None:
             self.removeCapsule(newState._capsuleEaten, self.capsules)
-        self.infoPane.updateScore(newState.score)
-        if 'ghostDistances' in dir(newState):
+        self.updateInfoPane(newState)
+
+    def updateInfoPane(self, newState):
+        # Text items are only redrawn when they change
+        if newState.score != self.shownScore:
+            self.infoPane.updateScore(newState.score)
+            self.shownScore = newState.score
+        if 'ghostDistances' in dir(newState) and newState.ghostDistances != self.shownGhostDistances:
             self.infoPane.updateGhostDistances(newState.ghostDistances)
+            self.shownGhostDistances = newState.ghostDistances
+
+    def queueUpdate(self, newState):
+        """
+        Records a move for the next batched redraw and redraws when the
+        round is complete, unless the last redraw was less than a frame ago.
+        """
+        self.pendingState = newState
+        self.pendingAgents.add(newState._agentMoved)
+        if newState._foodEaten != None:
+            self.pendingFood.append(newState._foodEaten)
+        if newState._capsuleEaten != None:
+            self.pendingCapsules.append(newState._capsuleEaten)
+        gameOver = newState._win or newState._lose
+        if newState._agentMoved != len(newState.agentStates) - 1 and not gameOver:
+            return
+        if time.time() - self.lastFrameTime < 1.0 / self.targetFps and not gameOver:
+            self.framesDropped += 1
+            return
+        self.flush()
+
+    def flush(self):
+        """
+        Draws every queued change with a single refresh.
+        """
+        newState = self.pendingState
+        if newState is None:
+            return
+        for agentIndex in sorted(self.pendingAgents):
+            agentState = newState.agentStates[agentIndex]
+            if self.agentImages[agentIndex][0].isPacman != agentState.isPacman:
+                self.swapImages(agentIndex, agentState)
+            prevState, image = self.agentImages[agentIndex]
+            position = self.getPosition(agentState)
+            if agentState.isPacman:
+                moveCircle(image[0], self.to_screen(position), PACMAN_SCALE * self.gridSize,
+                           self.getEndpoints(self.getDirection(agentState), position))
+            else:
+                self.placeGhost(agentState, agentIndex, prevState, image)
+            self.agentImages[agentIndex] = (agentState, image)
+        for cell in self.pendingFood:
+            self.removeFood(cell, self.food)
+        for cell in self.pendingCapsules:
+            self.removeCapsule(cell, self.capsules)
+        self.updateInfoPane(newState)
+        refresh()
+
+        self.clearPending()
+        self.lastFrameTime = time.time()
+        if self.frameTime > 0:
+            sleep(self.frameTime)
+
+    def placeGhost(self, ghost, ghostIndex, prevGhost, ghostImageParts):
+        """
+        Moves a ghost's image without refreshing, recoloring it only when
+        its scared state changed.
+        """
+        old_x, old_y = self.to_screen(self.getPosition(prevGhost))
+        new_x, new_y = self.to_screen(self.getPosition(ghost))
+        if (old_x, old_y) != (new_x, new_y):
+            for ghostImagePart in ghostImageParts:
+                move_by(ghostImagePart, (new_x - old_x, new_y - old_y))
+        if (ghost.scaredTimer > 0) != (prevGhost.scaredTimer > 0):
+            color = self.getGhostColor(ghost, ghostIndex)
+            edit(ghostImageParts[0], ('fill', color), ('outline', color))
+        if self.getDirection(ghost) != self.getDirection(prevGhost) or (old_x, old_y) != (new_x, new_y):
+            self.moveEyes(self.getPosition(ghost),
+                          self.getDirection(ghost), ghostImageParts[-4:])
 
     def make_window(self, width, height):
         grid_width = (width-1) * self.gridSize
@@ -328,11 +430,16 @@ class PacmanGraphics:
             px, py = self.getPosition(pacman)
             frames = 4.0
             for i in range(1, int(frames) + 1):
+                due = start + abs(self.frameTime) * i / frames
+                if i < frames and time.time() > due:
+                    # Behind schedule: drop this frame
+                    self.framesDropped += 1
+                    continue
                 pos = px*i/frames + fx * \
                     (frames-i)/frames, py*i/frames + fy*(frames-i)/frames
                 self.movePacman(pos, self.getDirection(pacman), image)
                 refresh()
-                sleep(abs(self.frameTime) / frames)
+                sleep(max(0, due - time.time()))
         else:
             self.movePacman(self.getPosition(pacman),
                             self.getDirection(pacman), image)
@@ -435,6 +542,7 @@ class PacmanGraphics:
         return agentState.configuration.getDirection()
 
     def finish(self):
+        self.flush()
         end_graphics()
 
     def to_screen(self, point):
@@ -13,10 +13,12 @@
 
 
 from util import manhattanDistance
+from util import nearestPoint
 from game import Grid
+from game import Directions
+import hashlib
 import os
 import random
-from functools import reduce
 
 VISIBILITY_MATRIX_CACHE = {}
 
@@ -37,34 +39,61 @@ class Layout:
         self.processLayoutText(layoutText)
         self.layoutText = layoutText
         self.totalFood = len(self.food.asList())
-        # self.initializeVisibilityMatrix()
+        # Built on first use by isVisibleFrom
+        self.visibility = None
 
     def getNumGhosts(self):
         return self.numGhosts
 
     def initializeVisibilityMatrix(self):
+        """
+        Builds the line-of-sight index: for every direction and every cell,
+        a bitset of the cells a Pacman standing there and facing that way can
+        see, i.e. its own cell and every cell along the ray up to the first
+        wall.  Rays are axis aligned, so each bitset only needs one bit per
+        cell of that row (East/West, bit x) or column (North/South, bit y).
+        Indices are shared by every layout with the same text.
+        """
         global VISIBILITY_MATRIX_CACHE
-        if reduce(str.__add__, self.layoutText) not in VISIBILITY_MATRIX_CACHE:
-            from game import Directions
-            vecs = [(-0.5, 0), (0.5, 0), (0, -0.5), (0, 0.5)]
-            dirs = [Directions.NORTH, Directions.SOUTH,
-                    Directions.WEST, Directions.EAST]
-            vis = Grid(self.width, self.height, {Directions.NORTH: set(), Directions.SOUTH: set(
-            ), Directions.EAST: set(), Directions.WEST: set(), Directions.STOP: set()})
-            for x in range(self.width):
-                for y in range(self.height):
-                    if self.walls[x][y] == False:
-                        for vec, direction in zip(vecs, dirs):
-                            dx, dy = vec
-                            nextx, nexty = x + dx, y + dy
-                            while (nextx + nexty) != int(nextx) + int(nexty) or not self.walls[int(nextx)][int(nexty)]:
-                                vis[x][y][direction].add((nextx, nexty))
-                                nextx, nexty = x + dx, y + dy
-            self.visibility = vis
-            VISIBILITY_MATRIX_CACHE[reduce(str.__add__, self.layoutText)] = vis
-        else:
-            self.visibility = VISIBILITY_MATRIX_CACHE[reduce(
-                str.__add__, self.layoutText)]
+        key = layoutTextHash(self.layoutText)
+        if key not in VISIBILITY_MATRIX_CACHE:
+            width, height, walls = self.width, self.height, self.walls
+            vis = dict((d, [0] * (width * height)) for d in
+                       [Directions.NORTH, Directions.SOUTH, Directions.EAST,
+                        Directions.WEST, Directions.STOP])
+            # Sweep each column and row once, splitting it into runs of open
+            # cells; a cell sees from itself to the end of its run
+            for x in range(width):
+                y = 0
+                while y < height:
+                    if walls[x][y]:
+                        y += 1
+                        continue
+                    start = y
+                    while y < height and not walls[x][y]:
+                        y += 1
+                    end = y - 1
+                    for cy in range(start, end + 1):
+                        index = x * height + cy
+                        vis[Directions.NORTH][index] = ((1 << (end + 1)) - 1) ^ ((1 << cy) - 1)
+                        vis[Directions.SOUTH][index] = ((1 << (cy + 1)) - 1) ^ ((1 << start) - 1)
+                        vis[Directions.STOP][index] = 1 << cy
+            for y in range(height):
+                x = 0
+                while x < width:
+                    if walls[x][y]:
+                        x += 1
+                        continue
+                    start = x
+                    while x < width and not walls[x][y]:
+                        x += 1
+                    end = x - 1
+                    for cx in range(start, end + 1):
+                        index = cx * height + y
+                        vis[Directions.EAST][index] = ((1 << (end + 1)) - 1) ^ ((1 << cx) - 1)
+                        vis[Directions.WEST][index] = ((1 << (cx + 1)) - 1) ^ ((1 << start) - 1)
+            VISIBILITY_MATRIX_CACHE[key] = vis
+        self.visibility = VISIBILITY_MATRIX_CACHE[key]
 
     def isWall(self, pos):
         x, col = pos
@@ -90,14 +119,40 @@ class Layout:
         return pos
 
     def isVisibleFrom(self, ghostPos, pacPos, pacDirection):
-        row, col = [int(x) for x in pacPos]
-        return ghostPos in self.visibility[row][col][pacDirection]
+        """
+        Returns whether a ghost at ghostPos is in Pacman's line of sight when
+        Pacman is at pacPos facing pacDirection.  Positions between cells
+        count as the nearest cell.  O(1) once the index is built.
+        """
+        if self.visibility is None:
+            self.initializeVisibilityMatrix()
+        x, y = nearestPoint(pacPos)
+        gx, gy = nearestPoint(ghostPos)
+        if pacDirection in (Directions.NORTH, Directions.SOUTH, Directions.STOP):
+            if gx != x:
+                return False
+            bit = gy
+        else:
+            if gy != y:
+                return False
+            bit = gx
+        return (self.visibility[pacDirection][x * self.height + y] >> bit) & 1 == 1
 
     def __str__(self):
         return "\n".join(self.layoutText)
 
     def deepCopy(self):
-        return Layout(self.layoutText[:])
+        """
+        Copies the food, capsules and agent positions.  Walls and the
+        visibility index never change after parsing, so the copy shares them.
+        """
+        copy = Layout.__new__(Layout)
+        copy.__dict__.update(self.__dict__)
+        copy.food = self.food.copy()
+        copy.capsules = self.capsules[:]
+        copy.agentPositions = self.agentPositions[:]
+        copy.layoutText = self.layoutText[:]
+        return copy
 
     def processLayoutText(self, layoutText):
         """
@@ -137,28 +192,80 @@ class Layout:
             self.numGhosts += 1
 
 
+# Parsed layouts keyed by a hash of their text, so identical boards share
+# one Layout (and everything derived from it) however they were loaded
+LAYOUT_TEXT_CACHE = {}
+# Resolved layout files: absolute path -> (modification time, Layout)
+LAYOUT_FILE_CACHE = {}
+
+
+def layoutTextHash(layoutText):
+    return hashlib.sha1('\n'.join(layoutText).encode('utf-8')).hexdigest()
+
+
+def layoutFromText(layoutText):
+    """
+    Returns the Layout for a list of layout lines, parsing each distinct
+    text only once per process.
+    """
+    key = layoutTextHash(layoutText)
+    if key not in LAYOUT_TEXT_CACHE:
+        LAYOUT_TEXT_CACHE[key] = Layout(layoutText)
+    return LAYOUT_TEXT_CACHE[key]
+
+
+def layoutSearchDirs(back=2):
+    """
+    Directories searched for layouts, nearest first: the working directory,
+    its ancestors up to back + 1 levels up, then this module's directory.
+    """
+    dirs = []
+    current = os.path.abspath('.')
+    for i in range(back + 2):
+        if current not in dirs:
+            dirs.append(current)
+        current = os.path.dirname(current)
+    here = os.path.dirname(os.path.abspath(__file__))
+    if here not in dirs:
+        dirs.append(here)
+    return dirs
+
+
+def resolveLayoutPath(name, back=2):
+    """
+    Returns the path of the file getLayout would load for name, or None.
+    Does not change the working directory.
+    """
+    if not name.endswith('.lay'):
+        name = name + '.lay'
+    if os.path.isabs(name):
+        return name if os.path.exists(name) else None
+    for directory in layoutSearchDirs(back):
+        for candidate in [os.path.join(directory, 'layouts', name), os.path.join(directory, name)]:
+            if os.path.exists(candidate):
+                return candidate
+    return None
+
+
 def getLayout(name, back=2):
-    if name.endswith('.lay'):
-        layout = tryToLoad('layouts/' + name)
-        if layout == None:
-            layout = tryToLoad(name)
-    else:
-        layout = tryToLoad('layouts/' + name + '.lay')
-        if layout == None:
-            layout = tryToLoad(name + '.lay')
-    if layout == None and back >= 0:
-        curdir = os.path.abspath('.')
-        os.chdir('..')
-        layout = getLayout(name, back - 1)
-        os.chdir(curdir)
-    return layout
+    path = resolveLayoutPath(name, back)
+    if path == None:
+        return None
+    return tryToLoad(path)
 
 
 def tryToLoad(fullname):
     if(not os.path.exists(fullname)):
         return None
+    fullname = os.path.abspath(fullname)
+    mtime = os.path.getmtime(fullname)
+    cached = LAYOUT_FILE_CACHE.get(fullname)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
     f = open(fullname)
     try:
-        return Layout([line.strip() for line in f])
+        layout = layoutFromText([line.strip() for line in f])
     finally:
         f.close()
+    LAYOUT_FILE_CACHE[fullname] = (mtime, layout)
+    return layout
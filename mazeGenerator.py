@@ -0,0 +1,160 @@
+# mazeGenerator.py
+# ----------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+Generates random Pacman mazes of any size as .lay text.
+
+The maze is carved with a randomized depth-first search over the cells with
+odd coordinates, which gives a perfect maze (exactly one path between any
+two cells).  Every wall left between two corridors is then knocked down with
+probability corridorDensity, so 0 gives a tree of dead ends and 1 an open
+field.  Pacman, ghosts, capsules and food are then placed on open cells.
+
+  python mazeGenerator.py -W 81 -H 41 -k 4 --seed 7 -o layouts/big.lay
+"""
+
+import random
+import sys
+
+
+def carveMaze(width, height, rng):
+    """
+    Returns a width x height matrix (indexed [x][y]) of booleans, True for
+    walls, with a perfect maze carved into it.
+    """
+    walls = [[True for y in range(height)] for x in range(width)]
+    start = (1, 1)
+    walls[1][1] = False
+    stack = [start]
+    while len(stack) > 0:
+        x, y = stack[-1]
+        neighbors = []
+        for dx, dy in [(2, 0), (-2, 0), (0, 2), (0, -2)]:
+            nx, ny = x + dx, y + dy
+            if 0 < nx < width - 1 and 0 < ny < height - 1 and walls[nx][ny]:
+                neighbors.append((nx, ny, x + dx // 2, y + dy // 2))
+        if len(neighbors) == 0:
+            stack.pop()
+            continue
+        nx, ny, wx, wy = rng.choice(neighbors)
+        walls[wx][wy] = False
+        walls[nx][ny] = False
+        stack.append((nx, ny))
+    return walls
+
+
+def openCorridors(walls, corridorDensity, rng):
+    """
+    Removes interior walls that separate two open cells with probability
+    corridorDensity, adding loops to the maze.
+    """
+    width, height = len(walls), len(walls[0])
+    for x in range(1, width - 1):
+        for y in range(1, height - 1):
+            if not walls[x][y]:
+                continue
+            horizontal = not walls[x - 1][y] and not walls[x + 1][y]
+            vertical = not walls[x][y - 1] and not walls[x][y + 1]
+            if (horizontal or vertical) and rng.random() < corridorDensity:
+                walls[x][y] = False
+
+
+def generateMaze(width, height, corridorDensity=0.3, foodDensity=0.8, numCapsules=4,
+                 numGhosts=2, seed=None):
+    """
+    Returns the lines of a .lay file (top row first) for a random maze.
+
+    width, height:    board size including the outer wall (at least 5 x 5)
+    corridorDensity:  probability of removing each wall between corridors
+    foodDensity:      probability of food on each free open cell
+    numCapsules:      number of power capsules
+    numGhosts:        number of ghost starting positions
+    seed:             seed for the maze's own random.Random
+    """
+    if width < 5 or height < 5:
+        raise Exception('Mazes must be at least 5 x 5, not %d x %d' % (width, height))
+    rng = random.Random(seed)
+    walls = carveMaze(width, height, rng)
+    openCorridors(walls, corridorDensity, rng)
+
+    cells = [(x, y) for x in range(width) for y in range(height) if not walls[x][y]]
+    if len(cells) < 2 + numGhosts + numCapsules:
+        raise Exception('Maze too small for %d ghosts and %d capsules' % (numGhosts, numCapsules))
+    rng.shuffle(cells)
+    board = [['%' if walls[x][y] else ' ' for y in range(height)] for x in range(width)]
+
+    pacman = cells.pop()
+    board[pacman[0]][pacman[1]] = 'P'
+    # Start ghosts away from Pacman when the maze is big enough
+    minDistance = (width + height) // 4
+    far = [c for c in cells if abs(c[0] - pacman[0]) + abs(c[1] - pacman[1]) >= minDistance]
+    if len(far) < numGhosts:
+        far = cells
+    for x, y in far[:numGhosts]:
+        board[x][y] = 'G'
+    cells = [(x, y) for x, y in cells if board[x][y] == ' ']
+    for x, y in cells[:numCapsules]:
+        board[x][y] = 'o'
+    hasFood = False
+    for x, y in cells[numCapsules:]:
+        if rng.random() < foodDensity:
+            board[x][y] = '.'
+            hasFood = True
+    if not hasFood:
+        x, y = cells[-1]
+        board[x][y] = '.'
+
+    return [''.join(board[x][y] for x in range(width)) for y in range(height - 1, -1, -1)]
+
+
+def readCommand(argv):
+    from optparse import OptionParser
+    from pacman import default
+    usageStr = """
+    USAGE:      python mazeGenerator.py <options>
+    EXAMPLES:   python mazeGenerator.py -W 201 -H 101 -k 4 --seed 1 -o layouts/huge.lay
+    """
+    parser = OptionParser(usageStr)
+    parser.add_option('-W', '--width', dest='width', type='int',
+                      help=default('board width including walls'), default=41)
+    parser.add_option('-H', '--height', dest='height', type='int',
+                      help=default('board height including walls'), default=21)
+    parser.add_option('-c', '--corridorDensity', dest='corridorDensity', type='float',
+                      help=default('probability of opening each wall between corridors'), default=0.3)
+    parser.add_option('-f', '--foodDensity', dest='foodDensity', type='float',
+                      help=default('probability of food on each open cell'), default=0.8)
+    parser.add_option('--capsules', dest='numCapsules', type='int',
+                      help=default('number of capsules'), default=4)
+    parser.add_option('-k', '--numghosts', dest='numGhosts', type='int',
+                      help=default('number of ghosts'), default=2)
+    parser.add_option('-s', '--seed', dest='seed', type='int',
+                      help=default('random seed'), default=0)
+    parser.add_option('-o', '--output', dest='output', default=None,
+                      help='Write the layout to this file instead of standard output')
+    options, otherjunk = parser.parse_args(argv)
+    if len(otherjunk) != 0:
+        raise Exception('Command line input not understood: ' + str(otherjunk))
+    return options
+
+
+if __name__ == '__main__':
+    options = readCommand(sys.argv[1:])
+    lines = generateMaze(options.width, options.height, options.corridorDensity,
+                         options.foodDensity, options.numCapsules, options.numGhosts,
+                         options.seed)
+    if options.output is None:
+        print('\n'.join(lines))
+    else:
+        with open(options.output, 'w') as handle:
+            handle.write('\n'.join(lines) + '\n')
@@ -13,7 +13,7 @@
 
 
 from util import manhattanDistance
-from game import Directions
+from game import Directions, Actions
 import random, util
 
 from game import Agent
@@ -306,3 +306,214 @@ class ExpectimaxAgent(MultiAgentSearchAgent):
             return averageOutcome
 
 
+def defaultGhostAction(state, ghostIndex):
+    """
+    The move a ghost is assumed to make when it is not the one replying in
+    best-reply search: the most likely move of a DirectionalGhost, i.e. the
+    legal move that brings it closest to Pacman (furthest when scared), the
+    first one in legal-action order on ties.  Returns None if it cannot move.
+    """
+    legalActions = state.getLegalActions(ghostIndex)
+    if len(legalActions) == 0:
+        return None
+    isScared = state.getGhostState(ghostIndex).scaredTimer > 0
+    speed = 0.5 if isScared else 1
+    x, y = state.getGhostPosition(ghostIndex)
+    pacmanPosition = state.getPacmanPosition()
+    best, bestAction = None, None
+    for action in legalActions:
+        dx, dy = Actions.directionToVector(action, speed)
+        distance = manhattanDistance((x + dx, y + dy), pacmanPosition)
+        if isScared:
+            distance = -distance
+        if best is None or distance < best:
+            best, bestAction = distance, action
+    return bestAction
+
+
+def effectiveBranchingFactor(numNodes, depth):
+    """
+    Returns the b for which a uniform tree of the given depth has numNodes
+    nodes below its root, i.e. b + b^2 + ... + b^depth = numNodes.
+    """
+    if depth <= 0 or numNodes <= 0:
+        return 0.0
+    low, high = 0.0, max(1.0, float(numNodes))
+    for i in range(100):
+        b = (low + high) / 2
+        if sum(b ** d for d in range(1, depth + 1)) < numNodes:
+            low = b
+        else:
+            high = b
+    return (low + high) / 2
+
+
+class BestReplySearchAgent(MultiAgentSearchAgent):
+    """
+    Alpha-beta search in which the ghosts' moves of a round form a single
+    minimizing layer.  ghostMode chooses how that layer is expanded:
+
+      brs:       Best-Reply Search.  Only one ghost replies per round and
+                 the others play defaultGhostAction, so a round branches on
+                 the sum of the ghosts' move counts instead of their product.
+      paranoid:  one joint ghost node per round over every combination of
+                 ghost moves.  Combinations are generated once, sharing
+                 prefixes, and pruned as a whole.
+      perGhost:  one ply per ghost, as in AlphaBetaAgent, for comparison.
+
+    Each getAction appends to self.searchStats the number of search nodes,
+    the number of states generated (which also counts the intermediate
+    states of a joint round) and the effective branching factor of the node
+    tree.  The nodes are Pacman's moves and the ghosts' moves: complete
+    rounds in brs and paranoid, whose tree has two layers per round, and
+    every single ghost move in perGhost, whose tree has one layer per agent
+    per round.  With stats=True a summary is printed when the game ends.
+
+      python pacman.py -p BestReplySearchAgent -a depth=3,ghostMode=brs,stats=True -l originalClassic -k 4
+    """
+    GHOST_MODES = ['brs', 'paranoid', 'perGhost']
+
+    def __init__(self, evalFn = 'scoreEvaluationFunction', depth = '2', ghostMode = 'brs', stats = 'False'):
+        MultiAgentSearchAgent.__init__(self, evalFn, depth)
+        if ghostMode not in self.GHOST_MODES:
+            raise Exception('Unknown ghostMode %s (choose from %s)' % (ghostMode, ', '.join(self.GHOST_MODES)))
+        self.ghostMode = ghostMode
+        self.printStats = str(stats).lower() in ['true', '1', 'yes']
+        self.searchStats = []
+        self.numNodes = 0
+        self.numGenerated = 0
+
+    def getAction(self, gameState):
+        self.numNodes = 0
+        self.numGenerated = 0
+        moves = gameState.getLegalActions(0)
+        if len(moves) == 0:
+            return Directions.STOP
+
+        bestMove = None
+        bestValue = float('-inf')
+        alpha = float('-inf')
+        for move in moves:
+            self.numNodes += 1
+            value = self.ghostValue(self.successor(gameState, 0, move), 0, alpha, float('inf'))
+            if value > bestValue:
+                bestValue = value
+                bestMove = move
+            alpha = max(alpha, value)
+
+        layersPerRound = gameState.getNumAgents() if self.ghostMode == 'perGhost' else 2
+        self.searchStats.append({'nodes': self.numNodes, 'generated': self.numGenerated,
+                                 'ebf': effectiveBranchingFactor(self.numNodes, layersPerRound * self.depth)})
+        return bestMove
+
+    def final(self, state):
+        if self.printStats and len(self.searchStats) > 0:
+            moves = len(self.searchStats)
+            nodes = sum(s['nodes'] for s in self.searchStats) / float(moves)
+            generated = sum(s['generated'] for s in self.searchStats) / float(moves)
+            ebf = sum(s['ebf'] for s in self.searchStats) / float(moves)
+            print('%s[%s, depth=%d]: %d moves, %.1f nodes and %.1f states generated per move, '
+                  'effective branching factor %.2f' %
+                  (self.__class__.__name__, self.ghostMode, self.depth, moves, nodes, generated, ebf))
+        self.searchStats = []
+
+    def successor(self, state, agentIndex, action):
+        self.numGenerated += 1
+        return state.generateSuccessor(agentIndex, action)
+
+    def isLeaf(self, state, depth):
+        return state.isWin() or state.isLose() or depth >= self.depth
+
+    def maxValue(self, state, depth, alpha, beta):
+        if self.isLeaf(state, depth):
+            return self.evaluationFunction(state)
+        moves = state.getLegalActions(0)
+        if len(moves) == 0:
+            return self.evaluationFunction(state)
+        best = float('-inf')
+        for move in moves:
+            self.numNodes += 1
+            best = max(best, self.ghostValue(self.successor(state, 0, move), depth, alpha, beta))
+            if best > beta:
+                return best
+            alpha = max(alpha, best)
+        return best
+
+    def ghostValue(self, state, depth, alpha, beta):
+        """
+        Value of the ghosts' layer of round depth, after Pacman has moved.
+        """
+        if state.isWin() or state.isLose():
+            return self.evaluationFunction(state)
+        if self.ghostMode == 'perGhost':
+            return self.perGhostValue(state, 1, depth, alpha, beta)
+        if self.ghostMode == 'brs':
+            replies = self.bestReplies(state)
+        else:
+            replies = self.jointReplies(state, 1)
+        worst = float('inf')
+        for reply in replies:
+            self.numNodes += 1
+            worst = min(worst, self.maxValue(reply, depth + 1, alpha, beta))
+            if worst < alpha:
+                return worst
+            beta = min(beta, worst)
+        return worst
+
+    def applyGhostMoves(self, state, replyingGhost, replyAction):
+        """
+        Moves every ghost in turn: replyingGhost plays replyAction and the
+        others play their default action.
+        """
+        for ghost in range(1, state.getNumAgents()):
+            if state.isWin() or state.isLose():
+                break
+            action = replyAction if ghost == replyingGhost else defaultGhostAction(state, ghost)
+            if action is not None:
+                state = self.successor(state, ghost, action)
+        return state
+
+    def bestReplies(self, state):
+        """
+        Yields the round outcome where every ghost plays its default action,
+        then one outcome for each other move of each single ghost.
+        """
+        yield self.applyGhostMoves(state, None, None)
+        for ghost in range(1, state.getNumAgents()):
+            default = defaultGhostAction(state, ghost)
+            for action in state.getLegalActions(ghost):
+                if action != default:
+                    yield self.applyGhostMoves(state, ghost, action)
+
+    def jointReplies(self, state, ghost):
+        """
+        Yields the round outcome of every combination of moves of ghosts
+        ghost, ghost + 1, ...
+        """
+        if ghost >= state.getNumAgents() or state.isWin() or state.isLose():
+            yield state
+            return
+        actions = state.getLegalActions(ghost)
+        if len(actions) == 0:
+            for reply in self.jointReplies(state, ghost + 1):
+                yield reply
+            return
+        for action in actions:
+            for reply in self.jointReplies(self.successor(state, ghost, action), ghost + 1):
+                yield reply
+
+    def perGhostValue(self, state, ghost, depth, alpha, beta):
+        if ghost >= state.getNumAgents() or state.isWin() or state.isLose():
+            # The round is complete
+            return self.maxValue(state, depth + 1, alpha, beta)
+        actions = state.getLegalActions(ghost)
+        if len(actions) == 0:
+            return self.perGhostValue(state, ghost + 1, depth, alpha, beta)
+        worst = float('inf')
+        for action in actions:
+            self.numNodes += 1
+            worst = min(worst, self.perGhostValue(self.successor(state, ghost, action), ghost + 1, depth, alpha, beta))
+            if worst < alpha:
+                return worst
+            beta = min(beta, worst)
+        return worst
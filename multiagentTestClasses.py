@@ -24,8 +24,6 @@ import testClasses
 import json
 
 from collections import defaultdict
-from pprint import PrettyPrinter
-pp = PrettyPrinter()
 
 from game import Agent
 from pacman import GameState
@@ -37,7 +35,6 @@ import sys
 import os
 import layout
 import pacman
-import autograder
 # import grading
 
 VERBOSE = False
@@ -141,14 +138,24 @@ def parseTreeProblem(testDict):
     return MultiagentTreeProblem(numAgents, startState, winStates, loseStates, successors, evaluation)
 
 
-def run(lay, layName, pac, ghosts, disp, nGames=1, name='games'):
+def seedGame(rng, seed):
+    """
+    Seeds a game's random stream, and the random module as well for
+    student code that still calls it directly.
+    """
+    rng.seed(seed)
+    if rng is not random:
+        random.seed(seed)
+
+
+def run(lay, layName, pac, ghosts, disp, nGames=1, name='games', seed=None):
     """
     Runs a few games and outputs their statistics.
     """
     starttime = time.time()
     print('*** Running %s on' % name, layName, '%d time(s).' % nGames)
     games = pacman.runGames(lay, pac, ghosts, disp,
-                            nGames, False, catchExceptions=True, timeout=120)
+                            nGames, False, catchExceptions=True, timeout=120, seed=seed)
     print('*** Finished running %s on' % name, layName,
           'after %d seconds.' % (time.time() - starttime))
     stats = {'time': time.time() - starttime, 'wins': [g.state.isWin() for g in games].count(True), 'games': games, 'scores': [g.state.getScore() for g in games],
@@ -180,9 +187,11 @@ class GradingAgent(Agent):
         self.seed = seed
 
     def registerInitialState(self, state):
+        # The student agent is not one of the game's agents; share the stream
+        self.studentAgent.rng = self.rng
         if 'registerInitialState' in dir(self.studentAgent):
             self.studentAgent.registerInitialState(state)
-        random.seed(self.seed)
+        seedGame(self.rng, self.seed)
 
     def getAction(self, state):
         GameState.getAndResetExplored()
@@ -212,7 +221,7 @@ class GradingAgent(Agent):
             self.suboptimalMoves.append(
                 (state, studentAction[0], optimalActions[0][0][0]))
         self.stepCount += 1
-        random.seed(self.seed + self.stepCount)
+        seedGame(self.rng, self.seed + self.stepCount)
         return optimalActions[0][0][0]
 
     def getSuboptimalMoves(self):
@@ -239,6 +248,41 @@ class GradingAgent(Agent):
             return len(self.suboptimalMoves)
 
 
+class SharedSuccessorState(GameState):
+    """
+    A GameState that remembers its successors, so several searches from the
+    same root share one game tree: each successor is generated once and
+    later requests for it, from any search, return the stored state.  A
+    deeper search reuses every node of a shallower one and only adds the
+    missing layers.  Every request still records the states in
+    GameState.explored, so explored-state counts are the same as without
+    sharing.  Shared states are never modified, so their hash is computed
+    once.
+    """
+
+    def __init__(self, state):
+        # Shares the data of state rather than copying it
+        self.data = state.data
+        self.successors = {}
+        self.hashValue = None
+
+    def __hash__(self):
+        if self.hashValue is None:
+            self.hashValue = GameState.__hash__(self)
+        return self.hashValue
+
+    def generateSuccessor(self, agentIndex, action):
+        key = (agentIndex, action)
+        successor = self.successors.get(key)
+        if successor is None:
+            successor = SharedSuccessorState(GameState.generateSuccessor(self, agentIndex, action))
+            self.successors[key] = successor
+        else:
+            GameState.explored.add(self)
+            GameState.explored.add(successor)
+        return successor
+
+
 class PolyAgent(Agent):
     def __init__(self, seed, multiAgents, ourPacOptions, depth):
         # prepare our pacman agents
@@ -288,13 +332,16 @@ class PolyAgent(Agent):
         return (ourpac, alternative_depth_pacs, partial_ply_bug_pacs)
 
     def registerInitialState(self, state):
+        for agent in self.solutionAgents + self.alternativeDepthAgents + self.partialPlyBugAgents:
+            agent.rng = self.rng
         for agent in self.solutionAgents + self.alternativeDepthAgents:
             if 'registerInitialState' in dir(agent):
                 agent.registerInitialState(state)
-        random.seed(self.seed)
+        seedGame(self.rng, self.seed)
 
     def getAction(self, state):
-        # survey agents
+        # survey agents on one shared game tree
+        state = SharedSuccessorState(state)
         GameState.getAndResetExplored()
         optimalActionLists = []
         for agent in self.solutionAgents:
@@ -309,7 +356,7 @@ class PolyAgent(Agent):
         self.alternativeDepthLists.append(alternativeDepthLists)
         self.partialPlyBugLists.append(partialPlyBugLists)
         self.stepCount += 1
-        random.seed(self.seed + self.stepCount)
+        seedGame(self.rng, self.seed + self.stepCount)
         return optimalActionLists[0][0][0]
 
     def getTraces(self):
@@ -339,14 +386,13 @@ class PacmanGameTreeTest(testClasses.TestCase):
         partialPlyBugActions = [json.loads(
             x) for x in solutionDict['partialPlyBugActions'].split('\n')]
         # set up game state and play a game
-        random.seed(self.seed)
-        lay = layout.Layout([l.strip() for l in self.layout_text.split('\n')])
+        lay = layout.layoutFromText([l.strip() for l in self.layout_text.split('\n')])
         pac = GradingAgent(self.seed, studentAgent, allActions,
                            altDepthActions, partialPlyBugActions)
         # check return codes and assign grades
         disp = self.question.getDisplay()
         stats = run(lay, self.layout_name, pac, [DirectionalGhost(
-            i + 1) for i in range(2)], disp, name=self.alg)
+            i + 1) for i in range(2)], disp, name=self.alg, seed=self.seed)
         if stats['timeouts'] > 0:
             self.addMessage('Agent timed out on smallClassic.  No credit')
             return self.testFail(grades)
@@ -385,8 +431,7 @@ class PacmanGameTreeTest(testClasses.TestCase):
     def writeSolution(self, moduleDict, filePath):
         # load module, set seed, create ghosts and macman, run game
         multiAgents = moduleDict['multiAgents']
-        random.seed(self.seed)
-        lay = layout.Layout([l.strip() for l in self.layout_text.split('\n')])
+        lay = layout.layoutFromText([l.strip() for l in self.layout_text.split('\n')])
         if self.alg == 'ExpectimaxAgent':
             ourPacOptions = {'expectimax': 'True'}
         elif self.alg == 'AlphaBetaAgent':
@@ -396,7 +441,7 @@ class PacmanGameTreeTest(testClasses.TestCase):
         pac = PolyAgent(self.seed, multiAgents, ourPacOptions, self.depth)
         disp = self.question.getDisplay()
         run(lay, self.layout_name, pac, [DirectionalGhost(
-            i + 1) for i in range(2)], disp, name=self.alg)
+            i + 1) for i in range(2)], disp, name=self.alg, seed=self.seed)
         (optimalActions, altDepthActions, partialPlyBugActions) = pac.getTraces()
         # recover traces and record to file
         handle = open(filePath, 'w')
@@ -467,6 +512,21 @@ import time
 from util import TimeoutFunction
 
 
+# When True, EvalAgentTest stops playing games as soon as its points can no
+# longer change (autograder.py --early-stop).  A test can also set earlyStop.
+EARLY_STOPPING = False
+
+
+def gradeThreshold(value, minimum, thresholds, name):
+    points = 0
+    passed = (minimum == None) or (value >= minimum)
+    if passed:
+        for t in thresholds:
+            if value >= t:
+                points += 2
+    return (passed, points, value, minimum, thresholds, name)
+
+
 class EvalAgentTest(testClasses.TestCase):
 
     def __init__(self, question, testDict):
@@ -495,6 +555,29 @@ class EvalAgentTest(testClasses.TestCase):
         self.maxPoints = sum([len(t) for t in [
                              self.scoreThresholds, self.nonTimeoutThresholds, self.winsThresholds]])
         self.agentArgs = testDict.get('agentArgs', '')
+        self.earlyStop = testDict.get('earlyStop', str(EARLY_STOPPING)).lower() == 'true'
+
+    def isDecided(self, games):
+        """
+        Returns True once more games cannot change the points: every
+        threshold result is fixed, or some minimum can no longer be reached
+        (which scores zero whatever the rest).  Wins and games not timed out
+        can only grow by the number of games left; the average score is
+        unbounded, so a test grading it only stops early on a failure.
+        """
+        remaining = self.numGames - len(games)
+        wins = [g.state.isWin() for g in games].count(True)
+        nonTimeouts = len(games) - [g.agentTimeout for g in games].count(True)
+        allFixed = self.scoreMinimum == None and len(self.scoreThresholds) == 0
+        for value, minimum, thresholds in [(nonTimeouts, self.nonTimeoutMinimum, self.nonTimeoutThresholds),
+                                           (wins, self.winsMinimum, self.winsThresholds)]:
+            lowest = gradeThreshold(value, minimum, thresholds, '')[:2]
+            highest = gradeThreshold(value + remaining, minimum, thresholds, '')[:2]
+            if lowest != highest:
+                allFixed = False
+            elif not lowest[0]:
+                return True
+        return allFixed
 
     def execute(self, grades, moduleDict, solutionDict):
         startTime = time.time()
@@ -508,9 +591,14 @@ class EvalAgentTest(testClasses.TestCase):
 
         disp = self.question.getDisplay()
 
-        random.seed(self.seed)
+        # Game i draws from its own stream, Random(seed + i), where all the
+        # games used to share one stream seeded once; the global module is
+        # still seeded for student code that calls it directly
+        seedGame(random, self.seed)
+        stopEarly = self.isDecided if self.earlyStop else None
         games = pacman.runGames(lay, agent, self.ghosts, disp, self.numGames,
-                                False, catchExceptions=True, timeout=self.maxTime)
+                                False, catchExceptions=True, timeout=self.maxTime,
+                                stopEarly=stopEarly, seed=self.seed)
         totalTime = time.time() - startTime
 
         stats = {'time': totalTime, 'wins': [g.state.isWin() for g in games].count(True),
@@ -518,17 +606,11 @@ class EvalAgentTest(testClasses.TestCase):
                  'timeouts': [g.agentTimeout for g in games].count(True), 'crashes': [g.agentCrashed for g in games].count(True)}
 
         averageScore = sum(stats['scores']) / float(len(stats['scores']))
-        nonTimeouts = self.numGames - stats['timeouts']
+        nonTimeouts = len(games) - stats['timeouts']
         wins = stats['wins']
-
-        def gradeThreshold(value, minimum, thresholds, name):
-            points = 0
-            passed = (minimum == None) or (value >= minimum)
-            if passed:
-                for t in thresholds:
-                    if value >= t:
-                        points += 2
-            return (passed, points, value, minimum, thresholds, name)
+        if len(games) < self.numGames:
+            self.addMessage('Stopped early after %d of %d games (%d games saved); the points are final' %
+                            (len(games), self.numGames, self.numGames - len(games)))
 
         results = [gradeThreshold(averageScore, self.scoreMinimum, self.scoreThresholds, "average score"),
                    gradeThreshold(nonTimeouts, self.nonTimeoutMinimum,
@@ -47,6 +47,7 @@ from util import nearestPoint
 from util import manhattanDistance
 import util
 import layout
+import array
 import sys
 import types
 import time
@@ -283,11 +284,12 @@ class ClassicGameRules:
     def __init__(self, timeout=30):
         self.timeout = timeout
 
-    def newGame(self, layout, pacmanAgent, ghostAgents, display, quiet=False, catchExceptions=False):
+    def newGame(self, layout, pacmanAgent, ghostAgents, display, quiet=False, catchExceptions=False, cpuTime=False,
+                rng=None):
         agents = [pacmanAgent] + ghostAgents[:layout.getNumGhosts()]
         initState = GameState()
         initState.initialize(layout, len(ghostAgents))
-        game = Game(agents, display, self, catchExceptions=catchExceptions)
+        game = Game(agents, display, self, catchExceptions=catchExceptions, cpuTime=cpuTime, rng=rng)
         game.state = initState
         self.initialState = initState.deepCopy()
         self.quiet = quiet
@@ -530,6 +532,10 @@ def readCommand(argv):
                       help='Display output as text only', default=False)
     parser.add_option('-q', '--quietTextGraphics', action='store_true', dest='quietGraphics',
                       help='Generate minimal output and no graphics', default=False)
+    parser.add_option('--ansiGraphics', action='store_true', dest='ansiGraphics',
+                      help='Display output as text, redrawing only changed cells (ANSI terminals)', default=False)
+    parser.add_option('--logGraphics', type='float', dest='logGraphics', metavar='SECONDS',
+                      help='Display output as plain text boards, at most one every SECONDS (for CI logs)', default=None)
     parser.add_option('-g', '--ghosts', dest='ghost',
                       help=default(
                           'the ghost agent TYPE in the ghostAgents module to use'),
@@ -540,6 +546,8 @@ def readCommand(argv):
                       help=default('Zoom the size of the graphics window'), default=1.0)
     parser.add_option('-f', '--fixRandomSeed', action='store_true', dest='fixRandomSeed',
                       help='Fixes the random seed to always play the same game', default=False)
+    parser.add_option('--seed', dest='seed', type='int', default=None,
+                      help='Play game i with its own random stream seeded with SEED + i')
     parser.add_option('-r', '--recordActions', action='store_true', dest='record',
                       help='Writes game histories to a file (named by the time they were played)', default=False)
     parser.add_option('--replay', dest='gameToReplay',
@@ -550,10 +558,28 @@ def readCommand(argv):
                       help=default('How many episodes are training (suppresses output)'), default=0)
     parser.add_option('--frameTime', dest='frameTime', type='float',
                       help=default('Time to delay between frames; <0 means keyboard'), default=0.1)
+    parser.add_option('--batchRender', action='store_true', dest='batchRender', default=False,
+                      help='Redraw once per round without animation, skipping rounds that come faster than --fps')
+    parser.add_option('--fps', dest='fps', type='float',
+                      help=default('Most redraws per second with --batchRender'), default=30.0)
+    parser.add_option('--asyncDisplay', dest='asyncDisplay', choices=['thread', 'process'], default=None,
+                      help='Draw the game in a rendering thread or process, letting the game run ahead '
+                           '(the graphical display needs process)')
     parser.add_option('-c', '--catchExceptions', action='store_true', dest='catchExceptions',
                       help='Turns on exception handling and timeouts during games', default=False)
     parser.add_option('--timeout', dest='timeout', type='int',
                       help=default('Maximum length of time an agent can spend computing in a single game'), default=30)
+    parser.add_option('--latency', action='store_true', dest='latency',
+                      help='Report p50/p90/p99/max getAction latency per agent', default=False)
+    parser.add_option('--cpuTime', action='store_true', dest='cpuTime',
+                      help='Measure move latency in CPU time instead of wall time', default=False)
+    parser.add_option('--startup-report', action='store_true', dest='startupReport', default=False,
+                      help='Print where the startup time of this command goes (python -X importtime) instead of running it')
+    parser.add_option('--profile', dest='profile', metavar='FILE',
+                      help='Profile the run and write the profile to FILE', default=None)
+    parser.add_option('--profiler', dest='profiler', choices=['cprofile', 'sample'],
+                      help=default('Profiler used by --profile: cprofile (pstats output) or sample (collapsed stacks)'),
+                      default='cprofile')
 
     options, otherjunk = parser.parse_args(argv)
     if len(otherjunk) != 0:
@@ -571,7 +597,8 @@ def readCommand(argv):
 
     # Choose a Pacman agent
     noKeyboard = options.gameToReplay == None and (
-        options.textGraphics or options.quietGraphics)
+        options.textGraphics or options.quietGraphics or options.ansiGraphics or
+        options.logGraphics != None)
     pacmanType = loadAgent(options.pacman, noKeyboard)
     agentOpts = parseAgentArgs(options.agentArgs)
     if options.numTraining > 0:
@@ -594,6 +621,12 @@ def readCommand(argv):
     if options.quietGraphics:
         import textDisplay
         args['display'] = textDisplay.NullGraphics()
+    elif options.logGraphics != None:
+        import textDisplay
+        args['display'] = textDisplay.LogGraphics(options.logGraphics)
+    elif options.ansiGraphics:
+        import textDisplay
+        args['display'] = textDisplay.AnsiGraphics(options.frameTime)
     elif options.textGraphics:
         import textDisplay
         textDisplay.SLEEP_TIME = options.frameTime
@@ -601,17 +634,28 @@ def readCommand(argv):
     else:
         import graphicsDisplay
         args['display'] = graphicsDisplay.PacmanGraphics(
-            options.zoom, frameTime=options.frameTime)
+            options.zoom, frameTime=options.frameTime,
+            batched=options.batchRender, targetFps=options.fps)
+    if options.asyncDisplay != None and not options.quietGraphics:
+        if options.pacman == 'KeyboardAgent' or options.frameTime < 0:
+            raise Exception('Keyboard control needs the display in the game thread (no --asyncDisplay)')
+        import asyncDisplay
+        args['display'] = asyncDisplay.AsyncDisplay(args['display'], options.asyncDisplay)
     args['numGames'] = options.numGames
     args['record'] = options.record
     args['catchExceptions'] = options.catchExceptions
     args['timeout'] = options.timeout
+    args['latency'] = options.latency
+    args['cpuTime'] = options.cpuTime
+    args['seed'] = options.seed
+    args['profile'] = options.profile
+    args['profiler'] = options.profiler
 
     # Special case: recorded games don't use the runGames method or args structure
     if options.gameToReplay != None:
         print('Replaying recorded game %s.' % options.gameToReplay)
         import pickle
-        f = open(options.gameToReplay)
+        f = open(options.gameToReplay, 'rb')
         try:
             recorded = pickle.load(f)
         finally:
@@ -632,6 +676,20 @@ def loadAgent(pacman, nographics):
         pythonPathDirs = pythonPathStr.split(';')
     pythonPathDirs.append('.')
 
+    # Import only the modules the agent index says bind the name
+    import agentRegistry
+    for modulename in agentRegistry.candidateModules(pacman, pythonPathDirs):
+        try:
+            module = __import__(modulename[:-3])
+        except ImportError:
+            continue
+        if pacman in dir(module):
+            if nographics and modulename == 'keyboardAgents.py':
+                raise Exception(
+                    'Using the keyboard requires graphics (not text display)')
+            return getattr(module, pacman)
+
+    # Names the index cannot see (star imports, ...): import every module
     for moduleDir in pythonPathDirs:
         if not os.path.isdir(moduleDir):
             continue
@@ -672,7 +730,32 @@ def replayGame(layout, actions, display):
     display.finish()
 
 
-def runGames(layout, pacman, ghosts, display, numGames, record, numTraining=0, catchExceptions=False, timeout=30):
+def printLatency(title, latencies, cpuTime):
+    """
+    Prints one line of move latency percentiles (in ms) per agent.
+    """
+    from game import latencyPercentiles
+    print('%s (%s time, ms):' % (title, ['wall', 'CPU'][int(cpuTime)]))
+    for agentIndex, agentLatencies in enumerate(latencies):
+        stats = latencyPercentiles(agentLatencies)
+        if stats is None:
+            continue
+        name = 'Pacman' if agentIndex == 0 else 'Ghost %d' % agentIndex
+        print('  %-8s moves %5d  mean %8.3f  p50 %8.3f  p90 %8.3f  p99 %8.3f  max %8.3f' % (
+            name, stats['moves'], stats['mean'] * 1000, stats['p50'] * 1000,
+            stats['p90'] * 1000, stats['p99'] * 1000, stats['max'] * 1000))
+
+
+def runGames(layout, pacman, ghosts, display, numGames, record, numTraining=0, catchExceptions=False, timeout=30,
+             latency=False, cpuTime=False, stopEarly=None, seed=None):
+    """
+    Plays numGames games and returns the ones after the training games.
+    If stopEarly is given it is called with that list after every such game,
+    and no more games are played once it returns True.  If seed is given,
+    game i draws every random choice from its own random.Random(seed + i),
+    so it plays the same whatever ran before it or alongside it; otherwise
+    the games share the global random module.
+    """
     import __main__
     __main__.__dict__['_display'] = display
 
@@ -689,22 +772,28 @@ def runGames(layout, pacman, ghosts, display, numGames, record, numTraining=0, c
         else:
             gameDisplay = display
             rules.quiet = False
+        rng = random.Random(seed + i) if seed is not None else None
         game = rules.newGame(layout, pacman, ghosts,
-                             gameDisplay, beQuiet, catchExceptions)
+                             gameDisplay, beQuiet, catchExceptions, cpuTime, rng)
         game.run()
         if not beQuiet:
             games.append(game)
+            if latency:
+                printLatency('Move latency, game %d' % (i + 1), game.agentLatencies, cpuTime)
 
         if record:
             import time
             import pickle
             fname = ('recorded-game-%d' % (i + 1)) + \
                 '-'.join([str(t) for t in time.localtime()[1:6]])
-            f = file(fname, 'w')
+            f = open(fname, 'wb')
             components = {'layout': layout, 'actions': game.moveHistory}
             pickle.dump(components, f)
             f.close()
 
+        if not beQuiet and stopEarly is not None and stopEarly(games):
+            break
+
     if (numGames-numTraining) > 0:
         scores = [game.state.getScore() for game in games]
         wins = [game.state.isWin() for game in games]
@@ -715,6 +804,15 @@ def runGames(layout, pacman, ghosts, display, numGames, record, numTraining=0, c
               (wins.count(True), len(wins), winRate))
         print('Record:       ', ', '.join(
             [['Loss', 'Win'][int(w)] for w in wins]))
+        if latency:
+            # Merge every game's latencies per agent index
+            merged = []
+            for game in games:
+                for agentIndex, agentLatencies in enumerate(game.agentLatencies):
+                    if agentIndex == len(merged):
+                        merged.append(array.array('d'))
+                    merged[agentIndex].extend(agentLatencies)
+            printLatency('Move latency, all games', merged, cpuTime)
 
     return games
 
@@ -730,9 +828,16 @@ if __name__ == '__main__':
 
     > python pacman.py --help
     """
+    if '--startup-report' in sys.argv[1:]:
+        # Checked before readCommand, which already loads layouts and agents
+        import profiling
+        profiling.startupReport(sys.argv[0], [arg for arg in sys.argv[1:] if arg != '--startup-report'])
+        sys.exit(0)
     args = readCommand(sys.argv[1:])  # Get game components based on input
-    runGames(**args)
-
-    # import cProfile
-    # cProfile.run("runGames( **args )")
+    profile, profiler = args.pop('profile'), args.pop('profiler')
+    if profile is None:
+        runGames(**args)
+    else:
+        import profiling
+        profiling.runProfiled(lambda: runGames(**args), profile, profiler)
     pass
@@ -0,0 +1,318 @@
+# profiling.py
+# ------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+Profiling support for pacman.py and autograder.py (--profile).
+
+Two profilers are available:
+
+  cprofile:  deterministic profile written as a pstats file.
+  sample:    statistical profile (SIGPROF timer) written as collapsed stacks,
+             one "frame;frame;frame count" line per distinct stack, which is
+             the input format of flamegraph.pl and speedscope.
+
+Both print a breakdown of where the time went.  Each unit of time is charged
+to the innermost frame on the stack that belongs to one of the BUCKETS, so
+time spent in GameState.generateSuccessor during a minimax search counts as
+rules, not as agent time.  State hashing and equality (which
+generateSuccessor pays for its explored-state bookkeeping) count as rules.
+Time with no bucketed frame on the stack is reported as "other".
+"""
+
+import os
+import sys
+import time
+
+AGENT = 'agent getAction'
+RULES = 'rules'
+COPYING = 'state copying'
+DISPLAY = 'display'
+GRADING = 'grading'
+OTHER = 'other'
+BUCKETS = [AGENT, RULES, COPYING, DISPLAY, GRADING, OTHER]
+
+RULES_FUNCTIONS = {
+    'pacman.py': set(['getLegalActions', 'generateSuccessor', 'applyAction', 'consume',
+                      'decrementTimer', 'checkDeath', 'collide', 'canKill', 'placeGhost',
+                      'process', 'win', 'lose', '__hash__', '__eq__']),
+    'game.py': set(['getPossibleActions', 'getLegalNeighbors', 'generateSuccessor',
+                    'directionToVector', 'vectorToDirection', 'reverseDirection',
+                    '__hash__', '__eq__']),
+}
+
+COPYING_FUNCTIONS = {
+    'pacman.py': set(['deepCopy']),
+    'game.py': set(['deepCopy', 'copy', 'shallowCopy', 'copyAgentStates']),
+    'layout.py': set(['deepCopy']),
+}
+
+# Classes whose __init__ copies the state when given a prevState and builds
+# a new one otherwise, so it is classified by how it was called
+COPY_CONSTRUCTORS = {'pacman.py': 'GameState', 'game.py': 'GameStateData'}
+
+DISPLAY_FILES = set(['graphicsDisplay.py', 'graphicsUtils.py', 'textDisplay.py', '__init__.py'])
+GRADING_FILES = set(['autograder.py', 'grading.py', 'testParser.py', 'testClasses.py'])
+
+
+def classify(filename, funcname):
+    """
+    Returns the bucket of a function given its file and name, or None if the
+    function should be charged to whoever called it.
+    """
+    base = os.path.basename(filename)
+    if base in COPYING_FUNCTIONS and funcname in COPYING_FUNCTIONS[base]:
+        return COPYING
+    if base in RULES_FUNCTIONS and funcname in RULES_FUNCTIONS[base]:
+        return RULES
+    if base.endswith('gents.py'):
+        return AGENT
+    if base in GRADING_FILES or base.endswith('TestClasses.py'):
+        return GRADING
+    if base in DISPLAY_FILES and (base != '__init__.py' or 'tkinter' in filename):
+        return DISPLAY
+    return None
+
+
+def copyConstructorCodes():
+    """
+    Returns (filename, first line) of the __init__ of every loaded class in
+    COPY_CONSTRUCTORS, as they appear in profiles.  pacman.py may be loaded
+    as __main__, so modules are matched by file name.
+    """
+    codes = set()
+    for module in list(sys.modules.values()):
+        className = COPY_CONSTRUCTORS.get(os.path.basename(getattr(module, '__file__', None) or ''))
+        if className is not None and hasattr(module, className):
+            code = getattr(module, className).__init__.__code__
+            codes.add((code.co_filename, code.co_firstlineno))
+    return codes
+
+
+def printBreakdown(totals, mode, out=sys.stdout):
+    total = sum(totals.values())
+    print('\nProfile breakdown (%s, %.2fs profiled):' % (mode, total), file=out)
+    for bucket in BUCKETS:
+        seconds = totals.get(bucket, 0.0)
+        share = 100.0 * seconds / total if total > 0 else 0.0
+        print('  %-16s %9.3fs %6.1f%%' % (bucket, seconds, share), file=out)
+
+
+########################
+# cProfile             #
+########################
+
+def cProfileBreakdown(stats):
+    """
+    Attributes the self time of every function in a pstats.Stats object to a
+    bucket.  Unbucketed functions (builtins, util, the game loop) hand their
+    time to their callers in proportion to the time each caller spent in
+    them, until a bucketed caller is found.  A profile does not show which
+    calls of a copy constructor passed a prevState; the ones from
+    generateSuccessor always do and are charged to copying, and the rest go
+    to their callers.
+    """
+    raw = stats.stats
+    memo = {}
+    copyCodes = copyConstructorCodes()
+
+    def shares(func, visiting):
+        # Returns {bucket: fraction} for time spent inside func
+        if func in memo:
+            return memo[func]
+        bucket = classify(func[0], func[2])
+        if bucket is not None:
+            result = {bucket: 1.0}
+        else:
+            callers = raw[func][4] if func in raw else {}
+            weights = {}
+            for caller, callerStats in callers.items():
+                if caller in visiting:
+                    continue
+                # callerStats = (cc, nc, tt, ct) of func when called from caller
+                weights[caller] = callerStats[3]
+            totalWeight = sum(weights.values())
+            result = {}
+            if totalWeight <= 0:
+                result[OTHER] = 1.0
+            else:
+                visiting.add(func)
+                copyConstructor = (func[0], func[1]) in copyCodes
+                for caller, weight in weights.items():
+                    if copyConstructor and caller[2] == 'generateSuccessor':
+                        callerShares = {COPYING: 1.0}
+                    else:
+                        callerShares = shares(caller, visiting)
+                    for b, fraction in callerShares.items():
+                        result[b] = result.get(b, 0.0) + fraction * weight / totalWeight
+                visiting.discard(func)
+        memo[func] = result
+        return result
+
+    totals = dict((b, 0.0) for b in BUCKETS)
+    for func, (cc, nc, tt, ct, callers) in raw.items():
+        for bucket, fraction in shares(func, set()).items():
+            totals[bucket] += tt * fraction
+    return totals
+
+
+def runCProfile(fn, outputPath):
+    import cProfile
+    import pstats
+    profile = cProfile.Profile()
+    try:
+        return profile.runcall(fn)
+    finally:
+        profile.dump_stats(outputPath)
+        stats = pstats.Stats(profile)
+        printBreakdown(cProfileBreakdown(stats), 'cprofile')
+        print('pstats written to %s' % outputPath)
+
+
+########################
+# Sampling profiler    #
+########################
+
+class SamplingProfiler:
+    """
+    Samples the main thread's stack on every SIGPROF tick (CPU time) and
+    counts identical stacks.
+    """
+
+    def __init__(self, interval=0.001):
+        self.interval = interval
+        self.stacks = {}
+        self.bucketSamples = dict((b, 0) for b in BUCKETS)
+        self.numSamples = 0
+        self.copyCodes = set()
+
+    def handle(self, signum, frame):
+        names = []
+        bucket = None
+        while frame is not None:
+            code = frame.f_code
+            if bucket is None:
+                if (code.co_filename, code.co_firstlineno) in self.copyCodes:
+                    if frame.f_locals.get('prevState') is not None:
+                        bucket = COPYING
+                else:
+                    bucket = classify(code.co_filename, code.co_name)
+            names.append('%s:%s' % (os.path.basename(code.co_filename),
+                                    getattr(code, 'co_qualname', code.co_name)))
+            frame = frame.f_back
+        names.reverse()
+        stack = ';'.join(names)
+        self.stacks[stack] = self.stacks.get(stack, 0) + 1
+        self.bucketSamples[bucket or OTHER] += 1
+        self.numSamples += 1
+
+    def start(self):
+        import signal
+        if not hasattr(signal, 'setitimer'):
+            raise Exception('The sampling profiler needs signal.setitimer (not available on this platform)')
+        self.copyCodes = copyConstructorCodes()
+        self.oldHandler = signal.signal(signal.SIGPROF, self.handle)
+        self.cpuStart = time.process_time()
+        signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+
+    def stop(self):
+        import signal
+        signal.setitimer(signal.ITIMER_PROF, 0, 0)
+        self.cpuTime = time.process_time() - self.cpuStart
+        signal.signal(signal.SIGPROF, self.oldHandler)
+
+    def writeCollapsed(self, outputPath):
+        with open(outputPath, 'w') as handle:
+            for stack in sorted(self.stacks):
+                handle.write('%s %d\n' % (stack, self.stacks[stack]))
+
+    def breakdown(self):
+        # The kernel may deliver fewer ticks than requested, so spread the
+        # measured CPU time over the samples instead of trusting the interval
+        perSample = self.cpuTime / self.numSamples if self.numSamples > 0 else 0.0
+        return dict((b, n * perSample) for b, n in self.bucketSamples.items())
+
+
+def runSampling(fn, outputPath, interval=0.001):
+    profiler = SamplingProfiler(interval)
+    profiler.start()
+    try:
+        return fn()
+    finally:
+        profiler.stop()
+        profiler.writeCollapsed(outputPath)
+        printBreakdown(profiler.breakdown(), 'sample, %d samples' % profiler.numSamples)
+        print('collapsed stacks written to %s' % outputPath)
+
+
+PROFILERS = {'cprofile': runCProfile, 'sample': runSampling}
+
+
+def runProfiled(fn, outputPath, profiler='cprofile'):
+    """
+    Runs fn() under the named profiler, writes its output to outputPath and
+    prints the per-component breakdown.  Returns fn's result.
+    """
+    if profiler not in PROFILERS:
+        raise Exception('Unknown profiler %s (choose from %s)' %
+                        (profiler, ', '.join(sorted(PROFILERS))))
+    start = time.time()
+    try:
+        return PROFILERS[profiler](fn, outputPath)
+    finally:
+        print('Wall time: %.2fs' % (time.time() - start))
+
+
+def parseImportTimes(text):
+    """
+    Parses the stderr of 'python -X importtime' into (self us, cumulative us,
+    module, depth) rows, depth 0 being the imports made by the program.
+    """
+    rows = []
+    for line in text.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        selfTime, cumulative, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        rows.append((int(selfTime), int(cumulative), name.strip(), depth))
+    return rows
+
+
+def startupReport(script, argv, top=15, out=sys.stdout):
+    """
+    Runs script with argv in a new interpreter under -X importtime, with its
+    output discarded, and prints how long it took, how much of that was
+    importing, and the slowest imports by cumulative and by self time.
+    """
+    import subprocess
+    start = time.time()
+    child = subprocess.run([sys.executable, '-X', 'importtime', script] + argv,
+                           stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                           universal_newlines=True)
+    wall = time.time() - start
+    rows = parseImportTimes(child.stderr)
+    imports = sum(cumulative for selfTime, cumulative, name, depth in rows if depth == 0)
+    print('Startup report for %s %s' % (script, ' '.join(argv)), file=out)
+    print('  Wall time %.3fs, importing %.3fs (%d modules)' %
+          (wall, imports / 1e6, len(rows)), file=out)
+    if child.returncode != 0:
+        print('  Exited with status %d:' % child.returncode, file=out)
+        for line in child.stderr.splitlines():
+            if not line.startswith('import time:'):
+                print('    ' + line, file=out)
+    print('\n  Slowest imports, children included (ms):', file=out)
+    for selfTime, cumulative, name, depth in sorted(rows, key=lambda row: -row[1])[:top]:
+        print('  %9.2f  %s%s' % (cumulative / 1e3, '  ' * depth, name), file=out)
+    print('\n  Slowest modules by their own import time (ms):', file=out)
+    for selfTime, cumulative, name, depth in sorted(rows, key=lambda row: -row[0])[:top]:
+        print('  %9.2f  %s' % (selfTime / 1e3, name), file=out)
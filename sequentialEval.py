@@ -0,0 +1,249 @@
+# sequentialEval.py
+# -----------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+Evaluates agents by playing games in batches until the answer is known.
+
+After every batch the running mean and variance of the score and a Wilson
+confidence interval for the win rate are updated.  With one agent the
+evaluation stops once the confidence intervals are narrower than the
+requested precision; with two agents (--compare) it stops as soon as
+Welch's test finds a significant difference in mean score, or once the
+difference is known to within the precision.  Either way it stops at
+--numGames games per agent.
+
+  python sequentialEval.py -p ExpectimaxAgent -l smallClassic --precision 25
+  python sequentialEval.py -p ExpectimaxAgent --compare AlphaBetaAgent -l smallClassic
+
+Game i of every agent is played with the random stream of --seed + i, so
+compared agents meet the same ghost moves wherever their choices agree.
+
+The stopping rule looks at the data after every batch, which makes a false
+"significant" result somewhat likelier than the nominal confidence level;
+use a high --confidence and a --minGames of a few dozen.
+"""
+
+import io
+import math
+import statistics
+import sys
+from contextlib import redirect_stdout
+
+import layout
+import pacman
+import textDisplay
+from pacman import default
+
+
+class RunningStats:
+    """
+    Mean and variance of a stream of numbers (Welford's method).
+    """
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def add(self, x):
+        self.n += 1
+        delta = x - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (x - self.mean)
+
+    def variance(self):
+        return self.m2 / (self.n - 1) if self.n > 1 else 0.0
+
+    def standardError(self):
+        return math.sqrt(self.variance() / self.n) if self.n > 0 else float('inf')
+
+
+def zScore(confidence):
+    """
+    Returns the two-sided normal critical value for a confidence level.
+    """
+    return statistics.NormalDist().inv_cdf(0.5 + confidence / 2)
+
+
+def wilsonInterval(successes, n, z):
+    """
+    Returns the Wilson score interval (low, high) for a binomial proportion.
+    """
+    if n == 0:
+        return (0.0, 1.0)
+    p = successes / float(n)
+    denominator = 1 + z * z / n
+    center = (p + z * z / (2 * n)) / denominator
+    halfWidth = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denominator
+    return (max(0.0, center - halfWidth), min(1.0, center + halfWidth))
+
+
+def welchTest(a, b):
+    """
+    Returns (difference of means, z statistic, two-sided p-value) for two
+    RunningStats, using the normal approximation to Welch's t-test.
+    """
+    difference = a.mean - b.mean
+    se = math.sqrt(a.variance() / a.n + b.variance() / b.n) if a.n > 0 and b.n > 0 else 0.0
+    if se == 0:
+        return (difference, 0.0 if difference == 0 else float('inf'), 1.0 if difference == 0 else 0.0)
+    z = difference / se
+    return (difference, z, 2 * (1 - statistics.NormalDist().cdf(abs(z))))
+
+
+class AgentRecord:
+    """
+    The running statistics of one agent's games.
+    """
+
+    def __init__(self, name, agent):
+        self.name = name
+        self.agent = agent
+        self.scores = RunningStats()
+        self.wins = 0
+
+    def addGames(self, games):
+        for game in games:
+            self.scores.add(game.state.getScore())
+            if game.state.isWin():
+                self.wins += 1
+
+    def describe(self, z):
+        low, high = wilsonInterval(self.wins, self.scores.n, z)
+        return '%-20s %5d games  score %9.2f +/- %-8.2f  win rate %.3f [%.3f, %.3f]' % (
+            self.name, self.scores.n, self.scores.mean, z * self.scores.standardError(),
+            self.wins / float(self.scores.n), low, high)
+
+
+def playBatch(record, lay, ghosts, numGames, timeout, seed=0):
+    # runGames prints a summary of every call; only ours is wanted
+    with redirect_stdout(io.StringIO()):
+        games = pacman.runGames(lay, record.agent, ghosts, textDisplay.NullGraphics(), numGames,
+                                False, catchExceptions=True, timeout=timeout,
+                                seed=seed + record.scores.n)
+    record.addGames(games)
+
+
+def isPrecise(record, z, precision, winPrecision):
+    if precision is not None and z * record.scores.standardError() > precision:
+        return False
+    if winPrecision is not None:
+        low, high = wilsonInterval(record.wins, record.scores.n, z)
+        if (high - low) / 2 > winPrecision:
+            return False
+    return True
+
+
+def evaluate(records, lay, ghosts, batchSize, minGames, maxGames, confidence,
+             precision=None, winPrecision=None, timeout=30, seed=0, out=sys.stdout):
+    """
+    Plays batches of games for every record until the stopping rule holds
+    (see the module docstring) or each agent has played maxGames.  Returns
+    the reason for stopping.
+    """
+    z = zScore(confidence)
+    reason = 'reached %d games' % maxGames
+    while records[0].scores.n < maxGames:
+        for record in records:
+            playBatch(record, lay, ghosts, min(batchSize, maxGames - record.scores.n), timeout, seed)
+            print(record.describe(z), file=out)
+        if records[0].scores.n < minGames:
+            continue
+        if len(records) == 2:
+            difference, zStat, pValue = welchTest(records[0].scores, records[1].scores)
+            print('%-20s difference %9.2f  z %6.2f  p %.4f' % ('', difference, zStat, pValue), file=out)
+            if abs(zStat) >= z:
+                reason = 'significant difference (p = %.4f)' % pValue
+                break
+            se = math.sqrt(records[0].scores.variance() / records[0].scores.n +
+                           records[1].scores.variance() / records[1].scores.n)
+            if precision is not None and z * se <= precision:
+                reason = 'difference known to +/- %.2f' % precision
+                break
+        elif all(isPrecise(record, z, precision, winPrecision) for record in records):
+            reason = 'requested precision reached'
+            break
+    played = sum(record.scores.n for record in records)
+    print('Stopped: %s after %d games (%d fewer than %d)' %
+          (reason, played, maxGames * len(records) - played, maxGames * len(records)), file=out)
+    return reason
+
+
+def readCommand(argv):
+    from optparse import OptionParser
+    usageStr = """
+    USAGE:      python sequentialEval.py <options>
+    EXAMPLES:   (1) python sequentialEval.py -p ExpectimaxAgent -l smallClassic --precision 25
+                (2) python sequentialEval.py -p ExpectimaxAgent --compare AlphaBetaAgent --batch 20
+    """
+    parser = OptionParser(usageStr)
+    parser.add_option('-p', '--pacman', dest='pacman',
+                      help=default('the agent TYPE to evaluate'), default='ExpectimaxAgent')
+    parser.add_option('-a', '--agentArgs', dest='agentArgs',
+                      help='Comma separated values sent to the agent. e.g. "opt1=val1,opt2"')
+    parser.add_option('--compare', dest='compare', default=None,
+                      help='A second agent TYPE to compare against')
+    parser.add_option('--compareArgs', dest='compareArgs', default=None,
+                      help='Arguments of the second agent (default: same as --agentArgs)')
+    parser.add_option('-l', '--layout', dest='layout',
+                      help=default('the LAYOUT_FILE from which to load the map layout'),
+                      default='smallClassic')
+    parser.add_option('-g', '--ghosts', dest='ghost',
+                      help=default('the ghost agent TYPE in the ghostAgents module to use'),
+                      default='RandomGhost')
+    parser.add_option('-k', '--numghosts', type='int', dest='numGhosts',
+                      help=default('The maximum number of ghosts to use'), default=4)
+    parser.add_option('-n', '--numGames', dest='numGames', type='int',
+                      help=default('the most games to play per agent'), default=1000)
+    parser.add_option('--batch', dest='batchSize', type='int',
+                      help=default('games per batch'), default=10)
+    parser.add_option('--minGames', dest='minGames', type='int',
+                      help=default('games per agent before the stopping rule applies'), default=30)
+    parser.add_option('--confidence', dest='confidence', type='float',
+                      help=default('confidence level of intervals and tests'), default=0.99)
+    parser.add_option('--precision', dest='precision', type='float',
+                      help=default('wanted half-width of the mean score interval'), default=20.0)
+    parser.add_option('--winPrecision', dest='winPrecision', type='float', default=None,
+                      help='wanted half-width of the win rate interval')
+    parser.add_option('-s', '--seed', dest='seed', type='int',
+                      help=default('seed of the first game of each agent'), default=0)
+    parser.add_option('--timeout', dest='timeout', type='int',
+                      help=default('Maximum length of time an agent can spend computing in a single game'), default=30)
+    options, otherjunk = parser.parse_args(argv)
+    if len(otherjunk) != 0:
+        raise Exception('Command line input not understood: ' + str(otherjunk))
+    return options
+
+
+def makeRecord(agentName, agentArgs):
+    agentType = pacman.loadAgent(agentName, True)
+    agent = agentType(**pacman.parseAgentArgs(agentArgs))
+    name = agentName if agentArgs is None else '%s(%s)' % (agentName, agentArgs)
+    return AgentRecord(name, agent)
+
+
+if __name__ == '__main__':
+    options = readCommand(sys.argv[1:])
+    lay = layout.getLayout(options.layout)
+    if lay is None:
+        raise Exception("The layout " + options.layout + " cannot be found")
+    ghostType = pacman.loadAgent(options.ghost, True)
+    ghosts = [ghostType(i + 1) for i in range(options.numGhosts)]
+    records = [makeRecord(options.pacman, options.agentArgs)]
+    if options.compare is not None:
+        compareArgs = options.compareArgs if options.compareArgs is not None else options.agentArgs
+        records.append(makeRecord(options.compare, compareArgs))
+    evaluate(records, lay, ghosts, options.batchSize, options.minGames, options.numGames,
+             options.confidence, options.precision, options.winPrecision, options.timeout,
+             options.seed)
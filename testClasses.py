@@ -13,7 +13,6 @@
 
 
 # import modules from python standard library
-import inspect
 import re
 import sys
 
@@ -24,6 +23,7 @@ import sys
 class Question(object):
 
     def raiseNotDefined(self):
+        import inspect
         print('Method not implemented: %s' % inspect.stack()[1][3])
         sys.exit(1)
 
@@ -144,6 +144,7 @@ class NumberPassedQuestion(Question):
 class TestCase(object):
 
     def raiseNotDefined(self):
+        import inspect
         print('Method not implemented: %s' % inspect.stack()[1][3])
         sys.exit(1)
 
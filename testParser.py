@@ -12,9 +12,66 @@
 # Pieter Abbeel (pabbeel@cs.berkeley.edu).
 
 
+import atexit
+import marshal
+import os
 import re
 import sys
 
+BLANK_LINE = re.compile(r'\A\s*\Z')
+ONELINE_PROPERTY = re.compile(r'\A([^"]*?):\s*"([^"]*)"\s*\Z')
+MULTILINE_START = re.compile(r'\A([^"]*?):\s*"""\s*\Z')
+MULTILINE_END = re.compile(r'\A\s*"""\s*\Z')
+
+# Parsed files by absolute path, as (mtime_ns, size, parseText result).  Loaded
+# from and saved to PARSE_CACHE_FILE so later runs can skip parsing too.
+PARSE_CACHE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.test_parse_cache')
+PARSE_CACHE = None
+PARSE_CACHE_DIRTY = False
+
+
+def loadParseCache():
+    global PARSE_CACHE
+    PARSE_CACHE = {}
+    try:
+        with open(PARSE_CACHE_FILE, 'rb') as handle:
+            PARSE_CACHE = marshal.loads(handle.read())
+    except Exception:
+        # Missing, truncated or from another Python version
+        PARSE_CACHE = {}
+
+
+def saveParseCache():
+    global PARSE_CACHE_DIRTY
+    if not PARSE_CACHE_DIRTY:
+        return
+    for path in [path for path in PARSE_CACHE if not os.path.exists(path)]:
+        del PARSE_CACHE[path]
+    temporary = '%s.%d.tmp' % (PARSE_CACHE_FILE, os.getpid())
+    try:
+        with open(temporary, 'wb') as handle:
+            handle.write(marshal.dumps(PARSE_CACHE))
+        os.replace(temporary, PARSE_CACHE_FILE)
+        PARSE_CACHE_DIRTY = False
+    except OSError:
+        pass
+
+
+def expandTestDict(parsed, path):
+    """
+    Builds a test dictionary from the compact form made by parseText.
+    """
+    text, emit, properties = parsed
+    raw_lines = text.split('\n')
+    test = {}
+    test['__raw_lines__'] = raw_lines
+    test['path'] = path
+    test['__emit__'] = [(kind, raw_lines[data] if kind == "raw" else data)
+                        for kind, data in emit]
+    for key, value in properties:
+        test[key] = value
+    return test
+
 
 class TestParser(object):
 
@@ -22,6 +79,29 @@ class TestParser(object):
         # save the path to the test file
         self.path = path
 
+    def parse(self):
+        """
+        Returns the parsed test dictionary, reusing an earlier parse of the
+        file for as long as its modification time and size are unchanged.
+        """
+        global PARSE_CACHE_DIRTY
+        if PARSE_CACHE is None:
+            loadParseCache()
+            atexit.register(saveParseCache)
+        key = os.path.abspath(self.path)
+        try:
+            stat = os.stat(key)
+            stamp = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            return self.parseFile()
+        cached = PARSE_CACHE.get(key)
+        if cached is None or tuple(cached[:2]) != stamp:
+            with open(self.path) as handle:
+                parsed = self.parseText(handle.read())
+            cached = PARSE_CACHE[key] = (stamp[0], stamp[1], parsed)
+            PARSE_CACHE_DIRTY = True
+        return expandTestDict(cached[2], self.path)
+
     def removeComments(self, rawlines):
         # remove any portion of a line following a '#' symbol
         fixed_lines = []
@@ -33,45 +113,49 @@ class TestParser(object):
                 fixed_lines.append(l[0:idx])
         return '\n'.join(fixed_lines)
 
-    def parse(self):
-        # read in the test case and remove comments
-        test = {}
+    def parseFile(self):
+        # read in the test case without going through the cache
         with open(self.path) as handle:
-            raw_lines = handle.read().split('\n')
+            return expandTestDict(self.parseText(handle.read()), self.path)
 
-        test_text = self.removeComments(raw_lines)
-        test['__raw_lines__'] = raw_lines
-        test['path'] = self.path
-        test['__emit__'] = []
-        lines = test_text.split('\n')
+    def parseText(self, text):
+        """
+        Parses the text of a test file into the compact, marshal-friendly
+        form (text, emit, properties) that expandTestDict turns into a test
+        dictionary.  Raw lines are kept in emit by line number.
+        """
+        raw_lines = text.split('\n')
+        lines = self.removeComments(raw_lines).split('\n')
+        emit = []
+        properties = []
         i = 0
         # read a property in each loop cycle
         while(i < len(lines)):
             # skip blank lines
-            if re.match('\A\s*\Z', lines[i]):
-                test['__emit__'].append(("raw", raw_lines[i]))
+            if BLANK_LINE.match(lines[i]):
+                emit.append(("raw", i))
                 i += 1
                 continue
-            m = re.match('\A([^"]*?):\s*"([^"]*)"\s*\Z', lines[i])
+            m = ONELINE_PROPERTY.match(lines[i])
             if m:
-                test[m.group(1)] = m.group(2)
-                test['__emit__'].append(("oneline", m.group(1)))
+                properties.append((m.group(1), m.group(2)))
+                emit.append(("oneline", m.group(1)))
                 i += 1
                 continue
-            m = re.match('\A([^"]*?):\s*"""\s*\Z', lines[i])
+            m = MULTILINE_START.match(lines[i])
             if m:
                 msg = []
                 i += 1
-                while(not re.match('\A\s*"""\s*\Z', lines[i])):
+                while(not MULTILINE_END.match(lines[i])):
                     msg.append(raw_lines[i])
                     i += 1
-                test[m.group(1)] = '\n'.join(msg)
-                test['__emit__'].append(("multiline", m.group(1)))
+                properties.append((m.group(1), '\n'.join(msg)))
+                emit.append(("multiline", m.group(1)))
                 i += 1
                 continue
             print('error parsing test file: %s' % self.path)
             sys.exit(1)
-        return test
+        return (text, emit, properties)
 
 
 def emitTestDict(testDict, handle):
@@ -12,7 +12,9 @@
 # Pieter Abbeel (pabbeel@cs.berkeley.edu).
 
 
+import sys
 import time
+from util import nearestPoint
 try:
     import pacman
 except:
@@ -83,3 +85,104 @@ class PacmanGraphics:
 
     def finish(self):
         pass
+
+
+def cellChar(state, x, y):
+    """
+    Returns the character str(state) shows at (x, y): capsules first, then
+    the last agent standing there, then food or wall.
+    """
+    if (x, y) in state.capsules:
+        return 'o'
+    for agentState in reversed(state.agentStates):
+        if agentState == None or agentState.configuration == None:
+            continue
+        if nearestPoint(agentState.configuration.pos) == (x, y):
+            if agentState.isPacman:
+                return state._pacStr(agentState.configuration.direction)
+            return state._ghostStr(agentState.configuration.direction)
+    return state._foodWallStr(state.food[x][y], state.layout.walls[x][y])
+
+
+def agentCells(state):
+    return [nearestPoint(agentState.configuration.pos)
+            for agentState in state.agentStates
+            if agentState != None and agentState.configuration != None]
+
+
+class AnsiGraphics(PacmanGraphics):
+    """
+    Draws the board once, then rewrites only the cells that changed, found
+    from the agents' cells and the state's _foodEaten and _capsuleEaten,
+    by moving the cursor with ANSI escape codes.  Pauses SLEEP_TIME after
+    each round like PacmanGraphics.
+    """
+
+    def __init__(self, speed=None, out=None):
+        PacmanGraphics.__init__(self, speed)
+        self.out = out if out != None else sys.stdout
+
+    def initialize(self, state, isBlue=False):
+        self.height = state.layout.height
+        self.screen = [list(row) for row in str(state).split('\n')[:self.height]]
+        self.score = state.score
+        self.cells = agentCells(state)
+        self.agentCounter = 0
+        self.out.write('\x1b[H\x1b[2J' + str(state))
+        self.out.flush()
+        self.pause()
+
+    def update(self, state):
+        cells = agentCells(state)
+        dirty = set(self.cells) | set(cells)
+        if state._foodEaten != None:
+            dirty.add(state._foodEaten)
+        if state._capsuleEaten != None:
+            dirty.add(state._capsuleEaten)
+        self.cells = cells
+
+        codes = []
+        for x, y in dirty:
+            row = self.height - 1 - y
+            char = cellChar(state, x, y)
+            if self.screen[row][x] != char:
+                self.screen[row][x] = char
+                codes.append('\x1b[%d;%dH%s' % (row + 1, x + 1, char))
+        if state.score != self.score:
+            self.score = state.score
+            codes.append('\x1b[%d;1H\x1b[KScore: %d' % (self.height + 1, state.score))
+        if len(codes) > 0:
+            # Leave the cursor below the board for anything else printed
+            self.out.write(''.join(codes) + '\x1b[%d;1H' % (self.height + 2))
+            self.out.flush()
+
+        self.agentCounter = (self.agentCounter + 1) % len(state.agentStates)
+        if self.agentCounter == 0:
+            self.pause()
+
+
+class LogGraphics(PacmanGraphics):
+    """
+    Prints plain whole boards, for logs: the first and last frame of each
+    game and at most one frame every interval seconds in between.
+    """
+
+    def __init__(self, interval=5.0, out=None):
+        PacmanGraphics.__init__(self)
+        self.interval = interval
+        self.out = out if out != None else sys.stdout
+
+    def initialize(self, state, isBlue=False):
+        self.moves = 0
+        self.lastDraw = time.time()
+        self.draw(state)
+
+    def update(self, state):
+        self.moves += 1
+        if state._win or state._lose or time.time() - self.lastDraw >= self.interval:
+            self.lastDraw = time.time()
+            self.draw(state)
+
+    def draw(self, state):
+        self.out.write('Move %d\n%s' % (self.moves, state))
+        self.out.flush()
@@ -0,0 +1,278 @@
+# tournament.py
+# -------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+Tournament.py plays every Pacman agent against every ghost type on every
+layout and prints a table of win rate, mean score and time per move.
+
+Each cell of the matrix is a single game identified by (agent, layout,
+ghost type, seed).  Finished cells are stored in a JSON cache keyed by a
+hash of the agent's source file, the layout text, the ghost type and the
+seed, so re-running a tournament only plays the games whose inputs changed.
+
+  python tournament.py -p MinimaxAgent,AlphaBetaAgent,ExpectimaxAgent
+                       -g RandomGhost,DirectionalGhost -n 5 -j 4 -a depth=2
+"""
+
+import hashlib
+import inspect
+import json
+import os
+import random
+import sys
+
+import layout
+import pacman
+import textDisplay
+from pacman import default, parseAgentArgs
+
+CACHE_VERSION = 2
+
+
+def fileHash(path):
+    "Returns the sha1 hex digest of a file's contents"
+    with open(path, 'rb') as handle:
+        return hashlib.sha1(handle.read()).hexdigest()
+
+
+def agentSourceHash(agentName):
+    """
+    Hashes the source file that defines an agent class, so that editing the
+    agent (or an evaluation function next to it) invalidates its results.
+    """
+    agentType = pacman.loadAgent(agentName, True)
+    return fileHash(inspect.getsourcefile(agentType))
+
+
+def listLayouts(layoutDir='layouts'):
+    "Returns the names of every .lay file in layoutDir"
+    return sorted(f[:-4] for f in os.listdir(layoutDir) if f.endswith('.lay'))
+
+
+class Cell:
+    """
+    A single game of the tournament matrix.
+    """
+
+    def __init__(self, agent, agentArgs, layoutName, ghost, seed, numGhosts, timeout):
+        self.agent = agent
+        self.agentArgs = agentArgs
+        self.layoutName = layoutName
+        self.ghost = ghost
+        self.seed = seed
+        self.numGhosts = numGhosts
+        self.timeout = timeout
+        self.key = None
+
+    def computeKey(self, agentHashes, layoutHashes):
+        parts = [CACHE_VERSION, self.agent, agentHashes[self.agent], self.agentArgs or '',
+                 layoutHashes[self.layoutName], self.ghost, self.seed,
+                 self.numGhosts, self.timeout]
+        self.key = hashlib.sha1(json.dumps(parts).encode('utf-8')).hexdigest()
+        return self.key
+
+
+def playCell(cell):
+    """
+    Plays the game described by cell and returns (key, result).  Runs inside
+    worker processes, so everything it needs is rebuilt from names.
+    """
+    lay = layout.getLayout(cell.layoutName)
+    pacmanType = pacman.loadAgent(cell.agent, True)
+    pac = pacmanType(**parseAgentArgs(cell.agentArgs))
+    ghostType = pacman.loadAgent(cell.ghost, True)
+    ghosts = [ghostType(i + 1) for i in range(cell.numGhosts)]
+
+    # The game's agents draw from their own stream; agents that call the
+    # random module directly still get it seeded by the cell
+    random.seed(cell.seed)
+    rules = pacman.ClassicGameRules(cell.timeout)
+    game = rules.newGame(lay, pac, ghosts, textDisplay.NullGraphics(),
+                         quiet=True, catchExceptions=True, rng=random.Random(cell.seed))
+    game.run()
+
+    moveTimes = game.agentLatencies[0]
+    result = {'win': game.state.isWin(),
+              'score': game.state.getScore(),
+              'moves': len(moveTimes),
+              'agentTime': sum(moveTimes),
+              'crashed': game.agentCrashed,
+              'timeout': game.agentTimeout}
+    return cell.key, result
+
+
+def loadCache(path):
+    if path is None or not os.path.exists(path):
+        return {}
+    try:
+        with open(path) as handle:
+            cache = json.load(handle)
+    except ValueError:
+        print('Ignoring unreadable tournament cache %s' % path, file=sys.stderr)
+        return {}
+    return cache
+
+
+def saveCache(cache, path):
+    if path is None:
+        return
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as handle:
+        json.dump(cache, handle, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def buildMatrix(agents, layoutNames, ghosts, numGames, baseSeed, agentArgs, numGhosts, timeout):
+    cells = []
+    for agent in agents:
+        for layoutName in layoutNames:
+            for ghost in ghosts:
+                for i in range(numGames):
+                    cells.append(Cell(agent, agentArgs, layoutName, ghost,
+                                      baseSeed + i, numGhosts, timeout))
+    return cells
+
+
+def runTournament(agents, layoutNames, ghosts, numGames=1, baseSeed=0, agentArgs=None,
+                  numGhosts=4, timeout=30, jobs=1, cachePath=None, rerun=False):
+    """
+    Plays every cell of the matrix that is not already cached and returns
+    the list of (cell, result) pairs in matrix order.
+    """
+    agentHashes = dict((a, agentSourceHash(a)) for a in agents)
+    layoutHashes = dict((l, layout.layoutTextHash(layout.getLayout(l).layoutText))
+                        for l in layoutNames)
+
+    cells = buildMatrix(agents, layoutNames, ghosts, numGames, baseSeed,
+                        agentArgs, numGhosts, timeout)
+    for cell in cells:
+        cell.computeKey(agentHashes, layoutHashes)
+
+    cache = loadCache(cachePath)
+    todo = [c for c in cells if rerun or c.key not in cache]
+    print('Tournament: %d games, %d cached, %d to play on %d worker(s)' %
+          (len(cells), len(cells) - len(todo), len(todo), jobs))
+
+    if jobs > 1 and len(todo) > 1:
+        import multiprocessing
+        pool = multiprocessing.Pool(jobs)
+        try:
+            for done, (key, result) in enumerate(pool.imap_unordered(playCell, todo)):
+                cache[key] = result
+                if (done + 1) % 10 == 0:
+                    saveCache(cache, cachePath)
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        for cell in todo:
+            key, result = playCell(cell)
+            cache[key] = result
+    saveCache(cache, cachePath)
+
+    return [(cell, cache[cell.key]) for cell in cells]
+
+
+def summarize(results):
+    """
+    Groups per-game results by (agent, ghost, layout) and returns rows of
+    (agent, ghost, layout, games, winRate, meanScore, secondsPerMove).
+    """
+    groups = {}
+    order = []
+    for cell, result in results:
+        group = (cell.agent, cell.ghost, cell.layoutName)
+        if group not in groups:
+            groups[group] = []
+            order.append(group)
+        groups[group].append(result)
+
+    rows = []
+    for group in order:
+        games = groups[group]
+        wins = [g['win'] for g in games].count(True)
+        moves = sum([g['moves'] for g in games])
+        agentTime = sum([g['agentTime'] for g in games])
+        rows.append(group + (len(games), wins / float(len(games)),
+                             sum([g['score'] for g in games]) / float(len(games)),
+                             agentTime / moves if moves > 0 else 0.0))
+    return rows
+
+
+def printTable(rows, out=sys.stdout):
+    header = ('Agent', 'Ghost', 'Layout', 'Games', 'Win rate', 'Mean score', 'ms/move')
+    lines = [header]
+    for agent, ghost, layoutName, games, winRate, meanScore, secondsPerMove in rows:
+        lines.append((agent, ghost, layoutName, str(games), '%.2f' % winRate,
+                      '%.1f' % meanScore, '%.2f' % (secondsPerMove * 1000)))
+    widths = [max(len(line[i]) for line in lines) for i in range(len(header))]
+    for n, line in enumerate(lines):
+        print('  '.join(field.ljust(w) for field, w in zip(line, widths)).rstrip(), file=out)
+        if n == 0:
+            print('  '.join('-' * w for w in widths), file=out)
+
+
+def readCommand(argv):
+    from optparse import OptionParser
+    usageStr = """
+    USAGE:      python tournament.py <options>
+    EXAMPLES:   python tournament.py -p MinimaxAgent,AlphaBetaAgent -a depth=2 -j 4
+                    - plays both agents against both ghost types on every layout
+    """
+    parser = OptionParser(usageStr)
+    parser.add_option('-p', '--pacman', dest='pacman',
+                      help=default('comma separated Pacman agent TYPES'),
+                      default='MinimaxAgent,AlphaBetaAgent,ExpectimaxAgent')
+    parser.add_option('-g', '--ghosts', dest='ghosts',
+                      help=default('comma separated ghost agent TYPES'),
+                      default='RandomGhost,DirectionalGhost')
+    parser.add_option('-l', '--layouts', dest='layouts',
+                      help='comma separated layouts [Default: every file in layouts/]', default=None)
+    parser.add_option('-a', '--agentArgs', dest='agentArgs',
+                      help='Comma separated values sent to every Pacman agent. e.g. "depth=2"')
+    parser.add_option('-n', '--numGames', dest='numGames', type='int',
+                      help=default('games (seeds) per cell'), default=1)
+    parser.add_option('-s', '--seed', dest='seed', type='int',
+                      help=default('seed of the first game in each cell'), default=0)
+    parser.add_option('-k', '--numghosts', type='int', dest='numGhosts',
+                      help=default('The maximum number of ghosts to use'), default=4)
+    parser.add_option('-j', '--jobs', dest='jobs', type='int',
+                      help=default('number of worker processes'), default=1)
+    parser.add_option('--timeout', dest='timeout', type='int',
+                      help=default('Maximum time an agent can spend computing in a single game'), default=30)
+    parser.add_option('--cache', dest='cache',
+                      help=default('JSON file holding cached game results'), default='tournament_cache.json')
+    parser.add_option('--no-cache', dest='noCache', action='store_true',
+                      help='Neither read nor write the result cache', default=False)
+    parser.add_option('--rerun', dest='rerun', action='store_true',
+                      help='Replay every game, refreshing the cache', default=False)
+
+    options, otherjunk = parser.parse_args(argv)
+    if len(otherjunk) != 0:
+        raise Exception('Command line input not understood: ' + str(otherjunk))
+    if options.layouts is None:
+        layoutNames = listLayouts()
+    else:
+        layoutNames = options.layouts.split(',')
+
+    return dict(agents=options.pacman.split(','), layoutNames=layoutNames,
+                ghosts=options.ghosts.split(','), numGames=options.numGames,
+                baseSeed=options.seed, agentArgs=options.agentArgs,
+                numGhosts=options.numGhosts, timeout=options.timeout, jobs=options.jobs,
+                cachePath=None if options.noCache else options.cache, rerun=options.rerun)
+
+
+if __name__ == '__main__':
+    args = readCommand(sys.argv[1:])
+    printTable(summarize(runTournament(**args)))
@@ -27,7 +27,6 @@
 
 
 import sys
-import inspect
 import heapq
 import random
 import io
@@ -233,6 +232,111 @@ class PriorityQueueWithFunction(PriorityQueue):
         PriorityQueue.push(self, item, self.priorityFunction(item))
 
 
+class IndexedPriorityQueue:
+    """
+    A priority queue with the interface of PriorityQueue that keeps a map
+    from each item to its place in the heap, so that update (decrease-key)
+    takes O(log n) instead of a scan of the whole heap.  Items must be
+    hashable and are queued at most once: pushing an item that is already
+    queued keeps the better of its two priorities, so that the item pops
+    when the better entry would have popped from PriorityQueue.  Equal
+    priorities pop in the order they were pushed, as in PriorityQueue.
+    """
+
+    def __init__(self):
+        # Entries are [priority, count, item]; count breaks ties
+        self.heap = []
+        self.index = {}
+        self.count = 0
+
+    def push(self, item, priority):
+        position = self.index.get(item)
+        if position is None:
+            self.heap.append([priority, self.count, item])
+            self.count += 1
+            self._siftUp(len(self.heap) - 1)
+        elif priority < self.heap[position][0]:
+            self.heap[position][0] = priority
+            self._siftUp(position)
+
+    def pop(self):
+        heap = self.heap
+        last = heap.pop()
+        if len(heap) == 0:
+            top = last
+        else:
+            top = heap[0]
+            heap[0] = last
+            self._siftDown(0)
+        del self.index[top[2]]
+        return top[2]
+
+    def isEmpty(self):
+        return len(self.heap) == 0
+
+    def update(self, item, priority):
+        # If item already in priority queue with higher priority, lower its priority.
+        # If item already in priority queue with equal or lower priority, do nothing.
+        # If item not in priority queue, do the same thing as self.push.
+        self.push(item, priority)
+
+    def getPriority(self, item):
+        return self.heap[self.index[item]][0]
+
+    def __contains__(self, item):
+        return item in self.index
+
+    def __len__(self):
+        return len(self.heap)
+
+    def _siftUp(self, position):
+        heap, index = self.heap, self.index
+        entry = heap[position]
+        while position > 0:
+            parentPosition = (position - 1) >> 1
+            parent = heap[parentPosition]
+            if not entry < parent:
+                break
+            heap[position] = parent
+            index[parent[2]] = position
+            position = parentPosition
+        heap[position] = entry
+        index[entry[2]] = position
+
+    def _siftDown(self, position):
+        heap, index = self.heap, self.index
+        size = len(heap)
+        entry = heap[position]
+        while True:
+            child = 2 * position + 1
+            if child >= size:
+                break
+            if child + 1 < size and heap[child + 1] < heap[child]:
+                child += 1
+            if not heap[child] < entry:
+                break
+            heap[position] = heap[child]
+            index[heap[position][2]] = position
+            position = child
+        heap[position] = entry
+        index[entry[2]] = position
+
+
+class IndexedPriorityQueueWithFunction(IndexedPriorityQueue):
+    """
+    IndexedPriorityQueue with the push signature of PriorityQueueWithFunction.
+    """
+
+    def __init__(self, priorityFunction):
+        "priorityFunction (item) -> priority"
+        self.priorityFunction = priorityFunction
+        IndexedPriorityQueue.__init__(self)
+
+    def push(self, item):
+        "Adds an item to the queue with priority from the priority function"
+        IndexedPriorityQueue.push(self, item, self.priorityFunction(item))
+
+
 def manhattanDistance(xy1, xy2):
     "Returns the Manhattan distance between points xy1 and xy2"
     return abs(xy1[0] - xy2[0]) + abs(xy1[1] - xy2[1])
@@ -464,6 +568,7 @@ class Counter(dict):
 
 
 def raiseNotDefined():
+    import inspect
     fileName = inspect.stack()[1][1]
     line = inspect.stack()[1][2]
     method = inspect.stack()[1][3]
@@ -495,10 +600,10 @@ def normalize(vectorOrCounter):
         return [el / s for el in vector]
 
 
-def nSample(distribution, values, n):
+def nSample(distribution, values, n, rng=random):
     if sum(distribution) != 1:
         distribution = normalize(distribution)
-    rand = [random.random() for i in range(n)]
+    rand = [rng.random() for i in range(n)]
     rand.sort()
     samples = []
     samplePos, distPos, cdf = 0, 0, distribution[0]
@@ -512,14 +617,14 @@ def nSample(distribution, values, n):
     return samples
 
 
-def sample(distribution, values=None):
+def sample(distribution, values=None, rng=random):
     if type(distribution) == Counter:
         items = sorted(distribution.items())
         distribution = [i[1] for i in items]
         values = [i[0] for i in items]
     if sum(distribution) != 1:
         distribution = normalize(distribution)
-    choice = random.random()
+    choice = rng.random()
     i, total = 0, distribution[0]
     while choice > total:
         i += 1
@@ -527,9 +632,9 @@ def sample(distribution, values=None):
     return values[i]
 
 
-def sampleFromCounter(ctr):
+def sampleFromCounter(ctr, rng=random):
     items = sorted(ctr.items())
-    return sample([v for k, v in items], [k for k, v in items])
+    return sample([v for k, v in items], [k for k, v in items], rng)
 
 
 def getProbability(value, distribution, values):
@@ -544,16 +649,95 @@ def getProbability(value, distribution, values):
     return total
 
 
-def flipCoin(p):
-    r = random.random()
+class AliasSampler:
+    """
+    Draws from a fixed discrete distribution in O(1) per draw, after an
+    O(n) setup that builds Walker's alias table (Vose's method).  Takes
+    the same arguments as sample: a Counter (or anything with items()),
+    or a list of weights and a list of values.  Weights need not be
+    normalized; values with zero weight are never drawn.  Draws come from
+    rng, a random.Random, or the random module if none is given; sample
+    also takes an rng for a single draw.
+    """
+
+    def __init__(self, distribution, values=None, rng=None):
+        if values is None:
+            items = sorted(distribution.items())
+            distribution = [weight for value, weight in items]
+            values = [value for value, weight in items]
+        pairs = [(weight, value) for weight, value in zip(distribution, values) if weight != 0]
+        if len(pairs) == 0:
+            raise ValueError('Cannot sample from an empty distribution')
+        n = len(pairs)
+        total = float(sum(weight for weight, value in pairs))
+        self.values = [value for weight, value in pairs]
+        self.rng = rng if rng is not None else random
+        scaled = [weight * n / total for weight, value in pairs]
+        self.probabilities = [1.0] * n
+        self.aliases = list(range(n))
+        small = [i for i in range(n) if scaled[i] < 1.0]
+        large = [i for i in range(n) if scaled[i] >= 1.0]
+        while small and large:
+            less, more = small.pop(), large.pop()
+            self.probabilities[less] = scaled[less]
+            self.aliases[less] = more
+            scaled[more] = (scaled[more] + scaled[less]) - 1.0
+            if scaled[more] < 1.0:
+                small.append(more)
+            else:
+                large.append(more)
+        # Whatever is left is 1 up to rounding and keeps probability 1
+
+    def sample(self, rng=None):
+        x = (rng if rng is not None else self.rng).random() * len(self.values)
+        i = int(x)
+        if x - i < self.probabilities[i]:
+            return self.values[i]
+        return self.values[self.aliases[i]]
+
+    def nSample(self, n):
+        return [self.sample() for i in range(n)]
+
+
+ALIAS_SAMPLER_CACHE = {}
+
+
+def cachedAliasSampler(distribution, values=None, rng=None):
+    """
+    Returns an AliasSampler for the distribution, reusing the one built for
+    an equal distribution and the same rng.  Only worth it for
+    distributions that are drawn from many times.
+    """
+    if values is None:
+        key = tuple(sorted(distribution.items()))
+    else:
+        key = (tuple(distribution), tuple(values))
+    key = (key, id(rng))
+    sampler = ALIAS_SAMPLER_CACHE.get(key)
+    if sampler is None or sampler.rng is not (rng if rng is not None else random):
+        if len(ALIAS_SAMPLER_CACHE) >= 10000:
+            ALIAS_SAMPLER_CACHE.clear()
+        sampler = ALIAS_SAMPLER_CACHE[key] = AliasSampler(distribution, values, rng)
+    return sampler
+
+
+def flipCoin(p, rng=random):
+    r = rng.random()
     return r < p
 
 
-def chooseFromDistribution(distribution):
-    "Takes either a counter or a list of (prob, key) pairs and samples"
+def chooseFromDistribution(distribution, rng=None):
+    """
+    Takes a counter, a list of (prob, key) pairs or anything with a sample
+    method and samples, drawing from rng (a random.Random) if it is given.
+    """
+    if hasattr(distribution, 'sample'):
+        return distribution.sample() if rng is None else distribution.sample(rng)
+    if rng is None:
+        rng = random
     if type(distribution) == dict or type(distribution) == Counter:
-        return sample(distribution)
-    r = random.random()
+        return sample(distribution, rng=rng)
+    r = rng.random()
     base = 0.0
     for prob, element in distribution:
         base += prob